@@ -16,6 +16,7 @@ from zkregex_fuzzer.configs import (
     FUZZER_VERSION,
     GENERATORS,
     INVALID_INPUT_GENERATORS,
+    PRIMARY_RUNNERS,
     TARGETS,
     VALID_INPUT_GENERATORS,
 )
@@ -33,8 +34,16 @@ from zkregex_fuzzer.runner.circom import (
     CircomSubprocess,
     SnarkjsSubprocess,
     ZkRegexSubprocess,
+    clean_stale_work_dirs,
 )
-from zkregex_fuzzer.runner.subprocess import BarretenbergSubprocess, NoirSubprocess
+from zkregex_fuzzer.runner.re2 import Re2Runner
+from zkregex_fuzzer.runner.subprocess import (
+    BarretenbergSubprocess,
+    NoirSubprocess,
+    RapidsnarkSubprocess,
+    WitnesscalcSubprocess,
+)
+from zkregex_fuzzer.utils import TMPFS_DIR, runner_threads
 
 
 def fuzz_parser():
@@ -61,6 +70,12 @@ def fuzz_parser():
         choices=list(TARGETS.keys()),
         help=f"The target to fuzz (options: {list(TARGETS.keys())}).",
     )
+    parser.add_argument(
+        "--primary-runner",
+        choices=list(PRIMARY_RUNNERS.keys()),
+        default="python_re",
+        help="The regex engine the target is compared against (default: python_re). re2 requires the google-re2 package.",
+    )
     parser.add_argument(
         "--valid-input-generator",
         choices=list(VALID_INPUT_GENERATORS.keys()),
@@ -136,6 +151,39 @@ def fuzz_parser():
         help="Run the proving and verification step with SnarkJS.",
     )
 
+    parser.add_argument(
+        "--circom-prove-rate",
+        type=float,
+        default=1.0,
+        help="Fraction of the inputs that go through the proving step with --circom-prove (default: 1.0).",
+    )
+
+    parser.add_argument(
+        "--circom-optimization",
+        choices=["O0", "O1", "O2"],
+        default="O2",
+        help="Constraint simplification level passed to circom (default: O2).",
+    )
+
+    parser.add_argument(
+        "--circom-prover",
+        choices=["snarkjs", "rapidsnark"],
+        default="snarkjs",
+        help="Prover used for the proving step (default: snarkjs). Verification always uses SnarkJS.",
+    )
+
+    parser.add_argument(
+        "--circom-witnesscalc",
+        action="store_true",
+        help="Generate witnesses with circom-witnesscalc instead of the SnarkJS WASM witness generator.",
+    )
+
+    parser.add_argument(
+        "--circom-cache-dir",
+        type=str,
+        help="Directory where compiled Circom circuits are cached and reused across runs.",
+    )
+
     parser.add_argument(
         "--circom-ptau",
         type=str,
@@ -148,6 +196,19 @@ def fuzz_parser():
         help="Run the proving and verification step with Barretenberg.",
     )
 
+    parser.add_argument(
+        "--noir-cache-dir",
+        type=str,
+        help="Directory where compiled Noir circuits are cached and reused across runs.",
+    )
+
+    parser.add_argument(
+        "--noir-prove-rate",
+        type=float,
+        default=1.0,
+        help="Fraction of the matching inputs that go through the proving step with --noir-prove (default: 1.0).",
+    )
+
     parser.add_argument(
         "--logger-level",
         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
@@ -198,6 +259,12 @@ def reproduce_parser():
         help="Path to the target directory output that want to be reproduced (support wildcard pattern).",
         required=True,
     )
+    parser.add_argument(
+        "--process-num",
+        type=int,
+        default=1,
+        help="Number of parallel process to use for reproducing (default: 1).",
+    )
     parser.add_argument(
         "--logger-level",
         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
@@ -208,7 +275,25 @@ def reproduce_parser():
     return parser
 
 
+def check_tmpfs_dir():
+    """
+    Check the directory of the temporary files before the runners use it.
+    """
+    if TMPFS_DIR and not os.path.isdir(TMPFS_DIR):
+        print(f"Temporary directory {TMPFS_DIR} does not exist.")
+        exit(1)
+
+
 def do_fuzz(args):
+    check_tmpfs_dir()
+
+    if args.primary_runner == "re2":
+        try:
+            Re2Runner.get_installed_version()
+        except ValueError as e:
+            print(e)
+            exit(1)
+
     if args.valid_input_generator == "predefined" and not args.predefined_inputs:
         print("Predefined inputs are required for predefined valid input generator.")
         exit(1)
@@ -229,6 +314,10 @@ def do_fuzz(args):
             circom_version = CircomSubprocess.get_installed_version()
             if args.circom_prove:
                 snarkjs_version = SnarkjsSubprocess.get_installed_version()
+                if args.circom_prover == "rapidsnark":
+                    RapidsnarkSubprocess.get_installed_version()
+            if args.circom_witnesscalc:
+                WitnesscalcSubprocess.get_installed_version()
 
         except ValueError as e:
             print(e)
@@ -248,6 +337,10 @@ def do_fuzz(args):
             print("Path to circom library is required for circom target.")
             exit(1)
 
+        if args.circom_cache_dir:
+            args.circom_cache_dir = str(Path(args.circom_cache_dir).resolve())
+            clean_stale_work_dirs(args.circom_cache_dir)
+
         # check if path to ptau used in proving step exists
         if args.circom_prove:
             if not args.circom_ptau:
@@ -259,6 +352,10 @@ def do_fuzz(args):
                 print(f"Path to ptau file {ptau_path} does not exist.")
                 exit(1)
 
+            if not 0 < args.circom_prove_rate <= 1:
+                print("The prove rate must be in (0, 1].")
+                exit(1)
+
     elif args.target == "noir":
         try:
             zk_regex_version = ZkRegexSubprocess.get_installed_version()
@@ -269,6 +366,13 @@ def do_fuzz(args):
             print(e)
             exit(1)
 
+        if args.noir_prove and not 0 < args.noir_prove_rate <= 1:
+            print("The prove rate must be in (0, 1].")
+            exit(1)
+
+        if args.noir_cache_dir:
+            args.noir_cache_dir = str(Path(args.noir_cache_dir).resolve())
+
     configuration = Configuration(
         fuzzer_version=FUZZER_VERSION,
         fuzzer=args.fuzzer,
@@ -297,6 +401,8 @@ def do_fuzz(args):
     print_fuzzing_configuration(configuration)
 
     kwargs = vars(args)
+    # The runners of the worker processes share the cores
+    kwargs["runner_threads"] = runner_threads(args.process_num)
 
     # set global seed
     random.seed(args.seed)
@@ -372,7 +478,12 @@ def do_fuzz(args):
 
 
 def do_reproduce(args):
-    reproduce(args.path)
+    check_tmpfs_dir()
+    try:
+        reproduce(args.path, args.process_num)
+    except ValueError as e:
+        print(e)
+        exit(1)
 
 
 def main():
@@ -20,7 +20,7 @@ from zkregex_fuzzer.regexgen import (
     DFARegexGenerator,
     GrammarRegexGenerator,
 )
-from zkregex_fuzzer.runner import CircomRunner, NoirRunner, PythonReRunner
+from zkregex_fuzzer.runner import CircomRunner, NoirRunner, PythonReRunner, Re2Runner
 from zkregex_fuzzer.vinpgen import (
     ExrexGenerator,
     GrammarBasedGenerator,
@@ -38,6 +38,12 @@ TARGETS = {
     "python_re": PythonReRunner,
 }
 
+# Regex engines used as the reference for the inputs and substrings
+PRIMARY_RUNNERS = {
+    "python_re": PythonReRunner,
+    "re2": Re2Runner,
+}
+
 GRAMMARS = {
     "basic": BASIC_REGEX_GRAMMAR,
     "old": OLD_GRAMMAR,
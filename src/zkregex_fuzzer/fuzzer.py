@@ -20,6 +20,7 @@ from zkregex_fuzzer.configs import (
     DEFAULT_REGEX_TIMEOUT,
     GRAMMARS,
     INVALID_INPUT_GENERATORS,
+    PRIMARY_RUNNERS,
     TARGETS,
     VALID_INPUT_GENERATORS,
 )
@@ -31,7 +32,6 @@ from zkregex_fuzzer.regexgen import (
     GrammarRegexGenerator,
 )
 from zkregex_fuzzer.report import Stats, print_stats
-from zkregex_fuzzer.runner import PythonReRunner
 from zkregex_fuzzer.runner.base_runner import Runner
 from zkregex_fuzzer.utils import pretty_regex, timeout_decorator
 
@@ -333,8 +333,8 @@ def harness_runtime(
     input_gen_timeout = kwargs.get("input_gen_timeout", DEFAULT_INPUT_GEN_TIMEOUT)
     harness_timeout = kwargs.get("harness_timeout", DEFAULT_HARNESS_TIMEOUT)
 
-    # We should use the PythonReRunner to check the validity of the regexes and the inputs.
-    primary_runner = PythonReRunner
+    # The primary runner checks the validity of the regexes and the inputs.
+    primary_runner = PRIMARY_RUNNERS[kwargs.get("primary_runner", "python_re")]
     if kwargs.get("process_num", 1) > 1:
         set_logging_enabled(False)
 
@@ -136,13 +136,12 @@ def harness(
             kwargs,
         )
 
-    failed_inputs = []
-    status = HarnessStatus.SUCCESS
+    primary_runner_strs = []
     for input in inputs:
-        primary_runner_str = None
         try:
             primary_runner_status, primary_runner_str = primary_runner.match(input)
             if primary_runner_status != oracle:
+                secondary_runner.clean()
                 return _return_harness_result(
                     HarnessResult(
                         regex, inp_num, oracle, [], HarnessStatus.INVALID_SEED
@@ -153,6 +152,7 @@ def harness(
                     kwargs,
                 )
         except RegexRunError as e:
+            secondary_runner.clean()
             return _return_harness_result(
                 HarnessResult(
                     regex, inp_num, oracle, [], HarnessStatus.INVALID_SEED, str(e)
@@ -162,38 +162,48 @@ def harness(
                 None,
                 kwargs,
             )
-        try:
-            secondary_runner_status, secondary_runner_str = secondary_runner.match(
-                input
-            )
-            if secondary_runner_status != oracle:
-                failed_inputs.append(input)
-                if status == HarnessStatus.SUBSTR_MISMATCH:
-                    logger.warning(
-                        f"regex: {regex}, input: {input}, failed with failed, when there is already a failed with substr mismatch input"
-                    )
-                status = HarnessStatus.FAILED
-
-            elif (
-                secondary_runner_status == oracle
-                and primary_runner_str != secondary_runner_str
-            ):
-                failed_inputs.append(input)
-                if status == HarnessStatus.FAILED:
-                    logger.warning(
-                        f"regex: {regex}, input: {input}, failed with substr mismatch, when there is already a failed input"
-                    )
-                status = HarnessStatus.SUBSTR_MISMATCH
-        except RegexRunError as e:
-            return _return_harness_result(
-                HarnessResult(
-                    regex, inp_num, oracle, [input], HarnessStatus.RUN_ERROR, str(e)
-                ),
-                status_to_save,
-                output_path,
-                secondary_runner,
-                kwargs,
-            )
+        primary_runner_strs.append(primary_runner_str)
+
+    # Run all the inputs at once, so that the secondary runner can batch
+    # the invocations of its tools.
+    try:
+        secondary_runner_results = secondary_runner.match_many(inputs)
+    except RegexRunError as e:
+        failed_input = [e.input] if e.input is not None else inputs
+        return _return_harness_result(
+            HarnessResult(
+                regex, inp_num, oracle, failed_input, HarnessStatus.RUN_ERROR, str(e)
+            ),
+            status_to_save,
+            output_path,
+            secondary_runner,
+            kwargs,
+        )
+
+    failed_inputs = []
+    status = HarnessStatus.SUCCESS
+    for input, primary_runner_str, (
+        secondary_runner_status,
+        secondary_runner_str,
+    ) in zip(inputs, primary_runner_strs, secondary_runner_results):
+        if secondary_runner_status != oracle:
+            failed_inputs.append(input)
+            if status == HarnessStatus.SUBSTR_MISMATCH:
+                logger.warning(
+                    f"regex: {regex}, input: {input}, failed with failed, when there is already a failed with substr mismatch input"
+                )
+            status = HarnessStatus.FAILED
+
+        elif (
+            secondary_runner_status == oracle
+            and primary_runner_str != secondary_runner_str
+        ):
+            failed_inputs.append(input)
+            if status == HarnessStatus.FAILED:
+                logger.warning(
+                    f"regex: {regex}, input: {input}, failed with substr mismatch, when there is already a failed input"
+                )
+            status = HarnessStatus.SUBSTR_MISMATCH
 
     if len(failed_inputs) > 0:
         return _return_harness_result(
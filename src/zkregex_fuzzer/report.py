@@ -3,6 +3,7 @@ Implements the logic for generating a report from the fuzzing results.
 """
 
 import os
+from collections import Counter
 from dataclasses import dataclass
 
 from zkregex_fuzzer.harness import HarnessResult, HarnessStatus
@@ -39,120 +40,51 @@ class Stats:
     """
 
     def __init__(self, results: list[tuple[str, list[list[str]], list[HarnessResult]]]):
-        self.regexes, self.inputs, self.results = zip(*results)
+        self._items = results
+
+    @property
+    def regexes(self) -> list[str]:
+        return [regex for regex, _, _ in self._items]
+
+    @property
+    def inputs(self) -> list[list[list[str]]]:
+        return [inputs for _, inputs, _ in self._items]
+
+    @property
+    def results(self) -> list[list[HarnessResult]]:
+        return [results for _, _, results in self._items]
 
     def get_stats(self):
+        # Walk the results once, counting input sizes and harness statuses
+        inputs_lens = [
+            len(inputs)
+            for _, oracle_inputs, _ in self._items
+            for inputs in oracle_inputs
+        ]
+        status_counts = Counter(
+            result.status
+            for _, _, oracle_results in self._items
+            for result in oracle_results
+        )
+        total_valid = status_counts[HarnessStatus.SUCCESS]
+        regexes_num = len(self._items)
+
         return {
-            "regexes": len(self.regexes),
-            "total_inputs": sum(
-                [
-                    len(inputs)
-                    for oracle_inputs in self.inputs
-                    for inputs in oracle_inputs
-                ]
-            ),
-            "avg_inputs": sum(
-                [
-                    len(inputs)
-                    for oracle_inputs in self.inputs
-                    for inputs in oracle_inputs
-                ]
-            )
-            / len(self.regexes),
-            "min_inputs": min(
-                [
-                    len(inputs)
-                    for oracle_inputs in self.inputs
-                    for inputs in oracle_inputs
-                ]
-            ),
-            "max_inputs": max(
-                [
-                    len(inputs)
-                    for oracle_inputs in self.inputs
-                    for inputs in oracle_inputs
-                ]
-            ),
-            "total_errors": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status != HarnessStatus.SUCCESS
-                ]
-            ),
-            "total_valid": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status == HarnessStatus.SUCCESS
-                ]
-            ),
-            "total_oracle_violations": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status == HarnessStatus.FAILED
-                ]
-            ),
-            "total_compile_errors": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status == HarnessStatus.COMPILE_ERROR
-                ]
-            ),
-            "total_run_errors": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status == HarnessStatus.RUN_ERROR
-                ]
-            ),
-            "total_invalid_seed": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status == HarnessStatus.INVALID_SEED
-                ]
-            ),
-            "total_input_gen_timeout": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status == HarnessStatus.INPUT_GEN_TIMEOUT
-                ]
-            ),
-            "total_harness_timeout": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status == HarnessStatus.HARNESS_TIMEOUT
-                ]
-            ),
-            "total_substr_mismatch": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status == HarnessStatus.SUBSTR_MISMATCH
-                ]
-            ),
-            "total_regex_timeout": sum(
-                [
-                    1
-                    for oracle_results in self.results
-                    for result in oracle_results
-                    if result.status == HarnessStatus.REGEX_TIMEOUT
-                ]
-            ),
+            "regexes": regexes_num,
+            "total_inputs": sum(inputs_lens),
+            "avg_inputs": sum(inputs_lens) / regexes_num if regexes_num else 0,
+            "min_inputs": min(inputs_lens, default=0),
+            "max_inputs": max(inputs_lens, default=0),
+            "total_errors": status_counts.total() - total_valid,
+            "total_valid": total_valid,
+            "total_oracle_violations": status_counts[HarnessStatus.FAILED],
+            "total_compile_errors": status_counts[HarnessStatus.COMPILE_ERROR],
+            "total_run_errors": status_counts[HarnessStatus.RUN_ERROR],
+            "total_invalid_seed": status_counts[HarnessStatus.INVALID_SEED],
+            "total_input_gen_timeout": status_counts[HarnessStatus.INPUT_GEN_TIMEOUT],
+            "total_harness_timeout": status_counts[HarnessStatus.HARNESS_TIMEOUT],
+            "total_substr_mismatch": status_counts[HarnessStatus.SUBSTR_MISMATCH],
+            "total_regex_timeout": status_counts[HarnessStatus.REGEX_TIMEOUT],
         }
 
 
@@ -161,29 +93,33 @@ class FuzzingReportData:
     pass
 
 
+_CONFIGURATION_TEMPLATE = (
+    "\n"
+    "Fuzzer: {fuzzer}\n"
+    "Target: {target}\n"
+    "Oracle: {oracle}\n"
+    "Valid input generator: {valid_input_generator}\n"
+    "Invalid input generator: {invalid_input_generator}\n"
+    "Regex num: {regex_num}\n"
+    "Inputs num: {inputs_num}\n"
+    "Grammar max non-terminals: {grammar_max_non_terminals}\n"
+    "Grammar custom grammar: {grammar_custom_grammar}\n"
+    "Seed: {seed}\n"
+    "Num process: {num_process}\n"
+    "zk-regex: {zk_regex_version}\n"
+    "Circom: {circom_version}\n"
+    "SnarkJS: {snarkjs_version}\n"
+    "Noir: {noir_version}\n"
+    "Barretenberg: {bb_version}\n"
+    "Logging file: {logging_file}\n"
+    "Output path: {output_path}\n"
+    "Save options: {save_options}\n"
+    "Char set: {char_set}\n"
+)
+
+
 def get_fuzzing_configuration_string(configuration: Configuration):
-    return f"""
-Fuzzer: {configuration.fuzzer}
-Target: {configuration.target}
-Oracle: {configuration.oracle}
-Valid input generator: {configuration.valid_input_generator}
-Invalid input generator: {configuration.valid_input_generator}
-Regex num: {configuration.regex_num}
-Inputs num: {configuration.inputs_num}
-Grammar max non-terminals: {configuration.grammar_max_non_terminals}
-Grammar custom grammar: {configuration.grammar_custom_grammar}
-Seed: {configuration.seed}
-Num process: {configuration.num_process}
-zk-regex: {configuration.zk_regex_version}
-Circom: {configuration.circom_version}
-SnarkJS: {configuration.snarkjs_version}
-Noir: {configuration.noir_version}
-Barretenberg: {configuration.bb_version}
-Logging file: {configuration.logging_file}
-Output path: {configuration.output_path}
-Save options: {configuration.save_options}
-Char set: {configuration.char_set}
-"""
+    return _CONFIGURATION_TEMPLATE.format(**vars(configuration))
 
 
 def print_fuzzing_configuration(configuration: Configuration):
@@ -238,6 +174,15 @@ def print_fuzzing_configuration(configuration: Configuration):
         if configuration.bb_version:
             target_specific_items.append(f"  - {configuration.bb_version}")
 
+    # Paths are shown relative to the current working directory
+    cwd = os.getcwd()
+    logging_file = (
+        os.path.relpath(configuration.logging_file, cwd)
+        if configuration.logging_file
+        else "None"
+    )
+    output_path = os.path.relpath(configuration.output_path, cwd)
+
     # Configuration items with side borders
     config_items = (
         [
@@ -256,9 +201,9 @@ def print_fuzzing_configuration(configuration: Configuration):
             f"🔍 Char set: {configuration.char_set}",
             f"🌱 Seed: {configuration.seed}",
             f"🔄 Num process: {configuration.num_process}",
-            f"🔍 Logging file: {os.path.relpath(configuration.logging_file, os.getcwd()) if configuration.logging_file else 'None'}",
+            f"🔍 Logging file: {logging_file}",
             f"🔍 Save options: {', '.join(configuration.save_options)}",
-            f"🔍 Output path: {os.path.relpath(configuration.output_path, os.getcwd())}",
+            f"🔍 Output path: {output_path}",
         ]
     )
 
@@ -271,6 +216,42 @@ def print_fuzzing_configuration(configuration: Configuration):
     print("╚" + "═" * (width - 2) + "╝")
 
 
+# Fixed parts of the statistics box
+_STATS_WIDTH = 80
+_STATS_TITLE = "📊 FUZZING CAMPAIGN RESULTS 📊"
+_STATS_TITLE_PADDING = (_STATS_WIDTH - 2 - len(_STATS_TITLE) + 2) // 2
+_STATS_TITLE_LINE = (
+    "║"
+    + " " * _STATS_TITLE_PADDING
+    + _STATS_TITLE
+    + " " * (_STATS_WIDTH - 4 - _STATS_TITLE_PADDING - len(_STATS_TITLE))
+    + "║"
+)
+_STATS_TOP_BORDER = "╔" + "═" * (_STATS_WIDTH - 2) + "╗"
+_STATS_DOUBLE_SEPARATOR = "╠" + "═" * (_STATS_WIDTH - 2) + "╣"
+_STATS_SEPARATOR = "╟" + "─" * (_STATS_WIDTH - 2) + "╢"
+_STATS_BOTTOM_BORDER = "╚" + "═" * (_STATS_WIDTH - 2) + "╝"
+_STATS_COVERAGE_HEADER = "║ 🔍 COVERAGE METRICS" + " " * (_STATS_WIDTH - 22) + "║"
+_STATS_RESULTS_HEADER = "║ 🧪 TEST RESULTS" + " " * (_STATS_WIDTH - 18) + "║"
+_STATS_ERRORS_HEADER = "║ ❌ ERROR BREAKDOWN" + " " * (_STATS_WIDTH - 21) + "║"
+_STATS_SKIP_NOTE = (
+    "║ We skip tests without inputs and tests when there is a compile error         ║"
+)
+_STATS_HEADER_LINES = (
+    _STATS_TITLE_LINE,
+    _STATS_DOUBLE_SEPARATOR,
+    _STATS_COVERAGE_HEADER,
+    _STATS_SEPARATOR,
+)
+_STATS_RESULTS_LINES = (
+    _STATS_SEPARATOR,
+    _STATS_RESULTS_HEADER,
+    _STATS_SEPARATOR,
+    _STATS_SKIP_NOTE,
+)
+_STATS_ERRORS_LINES = (_STATS_SEPARATOR, _STATS_ERRORS_HEADER, _STATS_SEPARATOR)
+
+
 def print_stats(stats: Stats):
     """
     Print statistics about the fuzzing run in a visually appealing format.
@@ -292,59 +273,40 @@ def print_stats(stats: Stats):
     success_rate = 100 - error_rate
 
     # Terminal width
-    term_width = 80
-
-    # Top border with title
-    print("\n" + "╔" + "═" * (term_width - 2) + "╗")
-    title = "📊 FUZZING CAMPAIGN RESULTS 📊"
-    padding = (term_width - 2 - len(title) + 2) // 2
-    print(
-        "║"
-        + " " * padding
-        + title
-        + " " * (term_width - 4 - padding - len(title))
-        + "║"
-    )
-    print("╠" + "═" * (term_width - 2) + "╣")
+    term_width = _STATS_WIDTH
 
-    # Coverage section
-    print("║ 🔍 COVERAGE METRICS" + " " * (term_width - 22) + "║")
-    print("╟" + "─" * (term_width - 2) + "╢")
-    print(
+    # Top border with title and coverage section header
+    lines = ["\n" + _STATS_TOP_BORDER]
+    lines.extend(_STATS_HEADER_LINES)
+    lines.append(
         f"║  • Regex patterns tested: {stats_dict['regexes']:,}"
         + " " * (term_width - 29 - len(f"{stats_dict['regexes']:,}"))
         + "║"
     )
-    print(
+    lines.append(
         f"║  • Total test inputs: {stats_dict['total_inputs']:,}"
         + " " * (term_width - 25 - len(f"{stats_dict['total_inputs']:,}"))
         + "║"
     )
-    print(
+    lines.append(
         f"║  • Avg inputs per regex: {stats_dict['avg_inputs']:.2f}"
         + " " * (term_width - 28 - len(f"{stats_dict['avg_inputs']:.2f}"))
         + "║"
     )
-    print(
+    lines.append(
         f"║  • Min inputs per regex: {stats_dict['min_inputs']:,}"
         + " " * (term_width - 28 - len(f"{stats_dict['min_inputs']:,}"))
         + "║"
     )
-    print(
+    lines.append(
         f"║  • Max inputs per regex: {stats_dict['max_inputs']:,}"
         + " " * (term_width - 28 - len(f"{stats_dict['max_inputs']:,}"))
         + "║"
     )
 
     # Results section
-    print("╟" + "─" * (term_width - 2) + "╢")
-    print("║ 🧪 TEST RESULTS" + " " * (term_width - 18) + "║")
-    print("╟" + "─" * (term_width - 2) + "╢")
-
-    print(
-        "║ We skip tests without inputs and tests when there is a compile error         ║"
-    )
-    print(
+    lines.extend(_STATS_RESULTS_LINES)
+    lines.append(
         f"║  • Total tests: {stats_dict['total_valid'] + stats_dict['total_errors']:,}"
         + " "
         * (
@@ -354,12 +316,12 @@ def print_stats(stats: Stats):
         )
         + "║"
     )
-    print(
+    lines.append(
         f"║  • Successful tests: {stats_dict['total_valid']:,}"
         + " " * (term_width - 24 - len(f"{stats_dict['total_valid']:,}"))
         + "║"
     )
-    print(
+    lines.append(
         f"║  • Failed tests: {stats_dict['total_errors']:,}"
         + " " * (term_width - 20 - len(f"{stats_dict['total_errors']:,}"))
         + "║"
@@ -373,7 +335,7 @@ def print_stats(stats: Stats):
     # Use plain ASCII for the progress bar
     success_bar = "#" * filled_chars + "-" * empty_chars
 
-    print(
+    lines.append(
         f"║  • Success rate: {success_rate:.2f}% [{success_bar}]"
         + " "
         * max(
@@ -387,9 +349,7 @@ def print_stats(stats: Stats):
 
     # Error breakdown
     if stats_dict["total_errors"] > 0:
-        print("╟" + "─" * (term_width - 2) + "╢")
-        print("║ ❌ ERROR BREAKDOWN" + " " * (term_width - 21) + "║")
-        print("╟" + "─" * (term_width - 2) + "╢")
+        lines.extend(_STATS_ERRORS_LINES)
 
         error_types = [
             ("Oracle violations", stats_dict["total_oracle_violations"]),
@@ -402,14 +362,17 @@ def print_stats(stats: Stats):
             ("Regex timeout", stats_dict["total_regex_timeout"]),
         ]
 
-        for error_type, count in error_types:
-            if count > 0:
-                percent = count / stats_dict["total_errors"] * 100
-                line = f"║  • {error_type}: {count:,} ({percent:.1f}%)"
-                print(line + " " * (term_width - len(line) - 1) + "║")
+        error_lines = [
+            f"║  • {error_type}: {count:,} ({count / stats_dict['total_errors'] * 100:.1f}%)"
+            for error_type, count in error_types
+            if count > 0
+        ]
+        lines += [
+            line + " " * (term_width - len(line) - 1) + "║" for line in error_lines
+        ]
 
     # Summary section
-    print("╠" + "═" * (term_width - 2) + "╣")
+    lines.append(_STATS_DOUBLE_SEPARATOR)
     if stats_dict["total_errors"] > 0:
         summary = f"💥 Found {stats_dict['total_errors']:,} potential issues by using {stats_dict['regexes']:,} regexes!"
     else:
@@ -417,7 +380,7 @@ def print_stats(stats: Stats):
 
     # Center the summary text
     padding = (term_width - 2 - len(summary)) // 2
-    print(
+    lines.append(
         "║"
         + " " * padding
         + summary
@@ -426,4 +389,6 @@ def print_stats(stats: Stats):
     )
 
     # Bottom border
-    print("╚" + "═" * (term_width - 2) + "╝\n")
+    lines.append(_STATS_BOTTOM_BORDER + "\n")
+
+    print("\n".join(lines))
@@ -2,18 +2,53 @@
 Reproduce bugs found by the fuzzer.
 """
 
+import contextlib
 import glob
+import io
 import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
-from zkregex_fuzzer.configs import TARGETS
+from zkregex_fuzzer.configs import PRIMARY_RUNNERS, TARGETS
 from zkregex_fuzzer.harness import HarnessStatus
 from zkregex_fuzzer.logger import logger
-from zkregex_fuzzer.runner import PythonReRunner, RegexCompileError, RegexRunError
-from zkregex_fuzzer.utils import pretty_regex
+from zkregex_fuzzer.runner import (
+    Re2Runner,
+    RegexCompileError,
+    RegexRunError,
+    Runner,
+)
+from zkregex_fuzzer.utils import pretty_regex, runner_threads
 
+# Maximum number of failed or mismatched inputs shown per bug report
+_MAX_DISPLAYED_INPUTS = 10
 
-def reproduce(path_list: list[str]):
+# Escape newlines and tabs for better display
+_DISPLAY_ESCAPES = str.maketrans({"\n": "\\n", "\t": "\\t", "\r": "\\r"})
+
+# Compiled target runners, reused by bug reports sharing a regex
+_RUNNER_CACHE_SIZE = 32
+_runner_cache: OrderedDict[str, Runner] = OrderedDict()
+
+
+def _format_input(inp: str, width: int = 70) -> str:
+    """
+    Truncate very long inputs with ellipsis and escape whitespace for display.
+    """
+    if len(inp) > width:
+        inp = inp[: width - 3] + "..."
+    return inp.translate(_DISPLAY_ESCAPES)
+
+
+def _collect_directories(path_list: list[str]) -> list[Path]:
+    """
+    Expand the given path patterns into bug report directories.
+    """
+    # Overlapping patterns may expand to the same directory; only load and
+    # reproduce each bug report once.
+    seen = set()
+    directories = []
     for pattern in path_list:
         expanded_path = glob.glob(pattern)
         if not expanded_path:
@@ -22,26 +57,136 @@ def reproduce(path_list: list[str]):
 
         for path in expanded_path:
             directory = Path(path)
-            if not directory.exists():
+            if not directory.exists() or directory.resolve() in seen:
                 continue
+            seen.add(directory.resolve())
 
             if not (directory / "metadata.json").exists():
                 logger.info(f"metadata.json is not exist in {directory}, skipping.")
                 continue
 
-            simulate_harness(directory)
+            directories.append(directory)
+
+    return directories
 
 
-def simulate_harness(directory: Path):
+def _load_metadata(directory: Path) -> dict:
     with open(str(directory / "metadata.json"), "r") as f:
-        metadata = json.loads(f.read())
+        return json.load(f)
+
+
+def _runner_key(metadata: dict) -> str:
+    """
+    Bug reports with the same regex and configuration can share a runner.
+    """
+    return json.dumps([metadata["regex"], metadata["config"]], sort_keys=True)
+
+
+def _get_runner(metadata: dict) -> Runner:
+    """
+    Return a compiled target runner for the bug report, reusing the runner
+    of a previous bug report with the same regex and configuration.
+    """
+    key = _runner_key(metadata)
+    if key in _runner_cache:
+        _runner_cache.move_to_end(key)
+        return _runner_cache[key]
+
+    kwargs = metadata["config"]
+    runner = TARGETS[kwargs["target"]](metadata["regex"], kwargs)
+    _runner_cache[key] = runner
+    if len(_runner_cache) > _RUNNER_CACHE_SIZE:
+        _, evicted_runner = _runner_cache.popitem(last=False)
+        evicted_runner.clean()
+    return runner
+
+
+def _clean_runners():
+    """
+    Clean the temporary files of all cached runners.
+    """
+    while _runner_cache:
+        _, runner = _runner_cache.popitem()
+        runner.clean()
+
+
+def _simulate_harnesses_to_string(
+    reports: list[tuple[int, Path, dict]],
+) -> dict[int, str]:
+    """
+    Run simulate_harness on bug reports sharing a regex and return the
+    reports by index instead of printing them, so that the output of
+    parallel workers does not interleave and keeps the directory order.
+    """
+    outputs = {}
+    try:
+        for index, directory, metadata in reports:
+            buffer = io.StringIO()
+            with contextlib.redirect_stdout(buffer):
+                simulate_harness(directory, metadata)
+            outputs[index] = buffer.getvalue()
+    finally:
+        _clean_runners()
+    return outputs
+
+
+def reproduce(path_list: list[str], process_num: int = 1):
+    """
+    Reproduce the bug reports in the given paths.
+
+    Raises ValueError if the primary runner of a bug report is not installed.
+    """
+    reports = [
+        (directory, _load_metadata(directory))
+        for directory in _collect_directories(path_list)
+    ]
+    # Check the primary runner once, like the fuzzer does, instead of failing
+    # to compile the regex of every bug report
+    if any(
+        metadata["config"].get("primary_runner") == "re2" for _, metadata in reports
+    ):
+        Re2Runner.get_installed_version()
+
+    # The runners share the cores between the reproducing processes, whatever
+    # the fuzzing run that saved the bug report used
+    threads = runner_threads(process_num)
+    for _, metadata in reports:
+        metadata["config"]["runner_threads"] = threads
+
+    try:
+        if process_num > 1 and len(reports) > 1:
+            # Send bug reports with the same regex to the same worker so that
+            # they share the compiled runner.
+            groups: dict[str, list[tuple[int, Path, dict]]] = {}
+            for index, (directory, metadata) in enumerate(reports):
+                groups.setdefault(_runner_key(metadata), []).append(
+                    (index, directory, metadata)
+                )
+
+            outputs: dict[int, str] = {}
+            with ProcessPoolExecutor(max_workers=process_num) as executor:
+                for group_outputs in executor.map(
+                    _simulate_harnesses_to_string, groups.values()
+                ):
+                    outputs.update(group_outputs)
+            for index in range(len(reports)):
+                print(outputs[index], end="")
+        else:
+            for directory, metadata in reports:
+                simulate_harness(directory, metadata)
+    finally:
+        _clean_runners()
+
+
+def simulate_harness(directory: Path, metadata: dict | None = None):
+    if metadata is None:
+        metadata = _load_metadata(directory)
 
     regex = metadata["regex"]
     inputs = metadata["inputs"]
     expected_status = metadata["status"]
     kwargs = metadata["config"]
 
-    target_runner = TARGETS[metadata["config"]["target"]]
     # TODO: simplify this, but we should fix past bug reports first
     oracle = True if metadata["config"]["oracle"] == "valid" else False
     if metadata["config"]["oracle"] == "combined":
@@ -69,25 +214,14 @@ def simulate_harness(directory: Path):
         print("   • No inputs provided")
     else:
         for i, inp in enumerate(inputs, 1):
-            # Truncate very long inputs with ellipsis
-            display_input = inp
-            if len(inp) > 70:
-                display_input = inp[:67] + "..."
-
-            # Escape newlines and tabs for better display
-            display_input = (
-                display_input.replace("\n", "\\n")
-                .replace("\t", "\\t")
-                .replace("\r", "\\r")
-            )
-            print(f'   {i}. "{display_input}"')
+            print(f'   {i}. "{_format_input(inp)}"')
 
     print("\n" + "─" * 80)
     print("🔬 REPRODUCTION RESULTS")
     print("─" * 80)
 
     try:
-        runner = target_runner(regex, kwargs)
+        runner = _get_runner(metadata)
     except RegexCompileError as e:
         if expected_status == HarnessStatus.COMPILE_ERROR.name:
             print("✅ Successfully reproduced COMPILE_ERROR!")
@@ -100,70 +234,79 @@ def simulate_harness(directory: Path):
         print("═" * 80 + "\n")
         return
 
-    python_runner = PythonReRunner(regex, kwargs)
-
-    failed_inputs = []
-    mismatched_inputs = []
-    for input in inputs:
-        try:
-            runner_status, runner_str = runner.match(input)
-            _, python_runner_str = python_runner.match(input)
-            if runner_status != oracle:
-                failed_inputs.append(input)
-            elif runner_str != python_runner_str:
-                mismatched_inputs.append(input)
-
-        except RegexRunError as e:
-            if expected_status == HarnessStatus.RUN_ERROR.name:
-                print("✅ Successfully reproduced RUN_ERROR!")
-                print("─" * 80)
-                print(f"🛑 Error details:\n{e}")
-            else:
-                print(f"❌ Unexpected RUN_ERROR status (expected {expected_status})")
-                print(f"🛑 Error details:\n{e}")
-
-    if len(failed_inputs) > 0:
+    primary_runner_cls = PRIMARY_RUNNERS[kwargs.get("primary_runner", "python_re")]
+    python_runner = primary_runner_cls(regex, kwargs)
+
+    try:
+        # The target runner spends its time waiting on external tools, so the
+        # Python re runner can do its matching in the meantime.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            runner_future = executor.submit(runner.match_many, inputs)
+            python_runner_future = executor.submit(python_runner.match_many, inputs)
+            runner_results = runner_future.result()
+            python_runner_results = python_runner_future.result()
+    except RegexRunError as e:
+        if expected_status == HarnessStatus.RUN_ERROR.name:
+            print("✅ Successfully reproduced RUN_ERROR!")
+            print("─" * 80)
+            print(f"🛑 Error details:\n{e}")
+        else:
+            print(f"❌ Unexpected RUN_ERROR status (expected {expected_status})")
+            print(f"🛑 Error details:\n{e}")
+
+        # The harness stops at the first run error as well, so there is
+        # nothing left to classify.
+        print("═" * 80 + "\n")
+        return
+
+    # Only the counts are needed to classify the result, so keep just the
+    # first few offending inputs around for display.
+    failed_count = 0
+    failed_examples = []
+    mismatched_count = 0
+    mismatched_examples = []
+    for input, (runner_status, runner_str), (_, python_runner_str) in zip(
+        inputs, runner_results, python_runner_results
+    ):
+        if runner_status != oracle:
+            failed_count += 1
+            if failed_count <= _MAX_DISPLAYED_INPUTS:
+                failed_examples.append(input)
+        elif runner_str != python_runner_str:
+            mismatched_count += 1
+            if mismatched_count <= _MAX_DISPLAYED_INPUTS:
+                mismatched_examples.append((input, python_runner_str, runner_str))
+
+    if failed_count > 0:
         if expected_status == HarnessStatus.FAILED.name:
             print("✅ Successfully reproduced FAILED status!")
-            print(f"   {len(failed_inputs)}/{len(inputs)} inputs failed validation")
+            print(f"   {failed_count}/{len(inputs)} inputs failed validation")
 
             # Show the failed inputs
             print("\n⚠️ Failed inputs:")
-            for i, inp in enumerate(failed_inputs, 1):
-                display_input = inp
-                if len(inp) > 70:
-                    display_input = inp[:67] + "..."
-                display_input = (
-                    display_input.replace("\n", "\\n")
-                    .replace("\t", "\\t")
-                    .replace("\r", "\\r")
-                )
-                print(f'   {i}. "{display_input}"')
+            for i, inp in enumerate(failed_examples, 1):
+                print(f'   {i}. "{_format_input(inp)}"')
+            if failed_count > len(failed_examples):
+                print(f"   ... and {failed_count - len(failed_examples)} more")
         else:
             print(f"❌ Unexpected FAILED status (expected {expected_status})")
-            print(f"   {len(failed_inputs)}/{len(inputs)} inputs failed validation")
-    elif len(mismatched_inputs) > 0:
+            print(f"   {failed_count}/{len(inputs)} inputs failed validation")
+    elif mismatched_count > 0:
         if expected_status == HarnessStatus.SUBSTR_MISMATCH.name:
             print("✅ Successfully reproduced SUBSTR_MISMATCH status!")
-            print(f"   {len(mismatched_inputs)}/{len(inputs)} inputs mismatched")
+            print(f"   {mismatched_count}/{len(inputs)} inputs mismatched")
 
             # Show the failed inputs
             print("\n⚠️ Mismatched inputs:")
-            for i, inp in enumerate(mismatched_inputs, 1):
-                display_input = inp
-                if len(inp) > 70:
-                    display_input = inp[:67] + "..."
-                display_input = (
-                    display_input.replace("\n", "\\n")
-                    .replace("\t", "\\t")
-                    .replace("\r", "\\r")
-                )
-                print(f'   {i}. "{display_input}"')
-                print(f"    - Expected: {python_runner_str}")
-                print(f"    - Actual: {runner_str}")
+            for i, (inp, expected_str, actual_str) in enumerate(mismatched_examples, 1):
+                print(f'   {i}. "{_format_input(inp)}"')
+                print(f"    - Expected: {expected_str}")
+                print(f"    - Actual: {actual_str}")
+            if mismatched_count > len(mismatched_examples):
+                print(f"   ... and {mismatched_count - len(mismatched_examples)} more")
         else:
             print(f"❌ Unexpected SUBSTR_MISMATCH status (expected {expected_status})")
-            print(f"   {len(mismatched_inputs)}/{len(inputs)} inputs mismatched")
+            print(f"   {mismatched_count}/{len(inputs)} inputs mismatched")
     else:
         if expected_status == HarnessStatus.SUCCESS.name:
             print("✅ Successfully reproduced SUCCESS status!")
@@ -172,5 +315,4 @@ def simulate_harness(directory: Path):
             print(f"❌ Unexpected SUCCESS status (expected {expected_status})")
             print("   All inputs passed validation")
 
-    runner.clean()
     print("═" * 80 + "\n")
@@ -2,3 +2,4 @@ from .base_runner import RegexCompileError, RegexRunError, Runner
 from .circom import CircomRunner
 from .noir import NoirRunner
 from .python import PythonReRunner
+from .re2 import Re2Runner
@@ -3,13 +3,17 @@ Runners for regex implementations.
 
 Supported runners:
 - Python re module
-
-TODO:
-- Circom runner
-- Noir runner
+- RE2
+- Circom
+- Noir
 """
 
+import functools
 from abc import ABC, abstractmethod
+from typing import Iterator
+
+# Decimal representations of the byte values, for writing the circuit inputs
+_DEC = tuple(str(i).encode() for i in range(256))
 
 
 class RegexCompileError(Exception):
@@ -25,7 +29,49 @@ class RegexRunError(Exception):
     Exception raised when a regex cannot be run.
     """
 
-    pass
+    def __init__(self, message: str = "", input: str | None = None):
+        super().__init__(message)
+        # The input that was being matched, if known
+        self.input = input
+
+
+@functools.cache
+def _zero_padding(max_input_size: int) -> bytes:
+    return b", 0" * max_input_size
+
+
+def encode_circuit_input(input: str, max_input_size: int) -> bytes:
+    """
+    Encode an input as the comma separated character codes of the input array
+    of a circuit, padded with zeroes to the max input size.
+    """
+    if len(input) > max_input_size:
+        raise RegexRunError(f"Input too large for input: {len(input)}")
+
+    try:
+        numeric_input = [_DEC[b] for b in input.encode("latin-1")]
+    except UnicodeEncodeError:
+        numeric_input = [str(ord(c)).encode() for c in input]
+
+    # Take the remaining ", 0" items of the precomputed padding
+    padding = _zero_padding(max_input_size)[len(numeric_input) * 3 :]
+    if not numeric_input:
+        padding = padding[2:]
+    return b", ".join(numeric_input) + padding
+
+
+def decode_circuit_output(values: list[int]) -> str:
+    """
+    Decode the character codes of the substring output by a circuit, without
+    its zero padding.
+    """
+    try:
+        # latin-1 maps every byte to the character with the same code
+        output = bytes(values).decode("latin-1")
+    except ValueError:
+        # A buggy circuit may output values that are not bytes
+        output = "".join([chr(c) for c in values])
+    return output.strip("\x00")
 
 
 class Runner(ABC):
@@ -36,6 +82,8 @@ class Runner(ABC):
     def __init__(self, regex: str, kwargs: dict):
         self._regex = regex
         self._runner = "Abstract runner"
+        # Results of the inputs already matched by match_many
+        self._results: dict[str, tuple[bool, str]] = {}
         self._regex_object = self.compile(regex)
 
     @abstractmethod
@@ -52,6 +100,38 @@ class Runner(ABC):
         """
         pass
 
+    def match_many(self, inputs: list[str]) -> list[tuple[bool, str]]:
+        """
+        Match the regex on a batch of inputs.
+
+        The regex is compiled once for the runner, so runners only pay the
+        per-input matching cost here. Repeated inputs, also across batches,
+        are only matched once.
+
+        Raises RegexRunError for the first input that cannot be run, with
+        the input attached to the error.
+        """
+        new_inputs = list(dict.fromkeys(i for i in inputs if i not in self._results))
+        if new_inputs:
+            results = self._match_batch(new_inputs)
+            for input in new_inputs:
+                try:
+                    self._results[input] = next(results)
+                except RegexRunError as e:
+                    if e.input is None:
+                        e.input = input
+                    raise
+        return [self._results[input] for input in inputs]
+
+    def _match_batch(self, inputs: list[str]) -> Iterator[tuple[bool, str]]:
+        """
+        Yield the results of distinct inputs in order. Runners that can run
+        several inputs concurrently, or feed them to a single tool
+        invocation, should override this.
+        """
+        for input in inputs:
+            yield self.match(input)
+
     @abstractmethod
     def clean(self) -> None:
         """
@@ -3,17 +3,89 @@ Runner for Circom.
 """
 
 import json
+import os
 import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator
 
 from zkregex_fuzzer.logger import logger
-from zkregex_fuzzer.runner.base_runner import RegexRunError, Runner
+from zkregex_fuzzer.runner.base_runner import (
+    RegexCompileError,
+    RegexRunError,
+    Runner,
+    decode_circuit_output,
+    encode_circuit_input,
+)
 from zkregex_fuzzer.runner.subprocess import (
     CircomSubprocess,
+    RapidsnarkSubprocess,
     SnarkjsSubprocess,
+    SnarkjsWorker,
+    WitnesscalcSubprocess,
     ZkRegexSubprocess,
 )
+from zkregex_fuzzer.utils import (
+    cache_entry_path,
+    is_sampled,
+    locked_cache_entry,
+    make_temp_dir,
+    store_in_cache,
+)
+
+# Subdirectory of the cache directory holding the working directories
+_WORK_DIR = "work"
+
+
+def _make_dir(cache_dir: str | None = None) -> str:
+    """
+    Create the working directory of a runner. With a cache it is created in
+    the work subdirectory of the cache directory, so that the compiled files
+    can be hard linked from and to the cache, otherwise on tmpfs if it has
+    room for the compiled circuit.
+    """
+    if cache_dir:
+        work_dir = Path(cache_dir) / _WORK_DIR
+        work_dir.mkdir(parents=True, exist_ok=True)
+        # The pid tells clean_stale_work_dirs whether the owner is still alive
+        return tempfile.mkdtemp(prefix=f"{os.getpid()}_", dir=work_dir)
+    return make_temp_dir()
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def clean_stale_work_dirs(cache_dir: str) -> None:
+    """
+    Remove the working directories left in the cache directory by runners
+    of processes that were killed before they could clean them.
+    """
+    work_dir = Path(cache_dir) / _WORK_DIR
+    if not work_dir.is_dir():
+        return
+    for path in work_dir.iterdir():
+        pid = path.name.split("_", 1)[0]
+        if pid.isdigit() and _is_running(int(pid)):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """
+    Hard link a file, or copy it if it is on another filesystem.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
 
 
 class CircomRunner(Runner):
@@ -27,23 +99,118 @@ class CircomRunner(Runner):
         self._wasm_path = ""
         self._zkey_path = ""
         self._vkey_path = ""
-        self._input_path = ""
-        self._dir_path = tempfile.TemporaryDirectory(delete=False).name
+        self._graph_path = ""
+        self._cache_dir = kwargs.get("circom_cache_dir", None)
+        self._dir_path = _make_dir(self._cache_dir)
+        self._inputs_dir_path = ""
 
         self._run_the_prover = kwargs.get("circom_prove", False)
+        self._prover = kwargs.get("circom_prover", "snarkjs")
+        self._prove_rate = kwargs.get("circom_prove_rate", 1.0)
+        self._use_witnesscalc = kwargs.get("circom_witnesscalc", False)
         self._ptau_path = kwargs.get("circom_ptau", None)
         self._link_path = kwargs.get("circom_library", [])
+        self._optimization = kwargs.get("circom_optimization", None)
         self._circom_max_input_size = kwargs.get("max_input_size", 200)
+        self._threads = kwargs.get("runner_threads", 1)
+        # The snarkjs workers serve the threads of match_many, and commands
+        # running longer than the harness are abandoned
+        SnarkjsWorker.configure(self._threads, kwargs.get("harness_timeout"))
         self._template_name = "TestRegex"
-        super().__init__(regex, kwargs)
+        try:
+            super().__init__(regex, kwargs)
+        except Exception:
+            # The working directory was already created, remove it as no
+            # one else will
+            self.clean()
+            raise
         self._runner = "Circom"
         self.identifer = ""
 
+    def _get_cache_path(self, regex: str) -> Path | None:
+        """
+        Return the cache entry for the compiled circuit of the regex,
+        or None if caching is disabled.
+        """
+        if not self._cache_dir:
+            return None
+
+        # Everything that changes the produced files is part of the key,
+        # including the tools so that upgrading them invalidates the cache
+        key_fields = [
+            ZkRegexSubprocess.get_installed_version(),
+            CircomSubprocess.get_installed_version(),
+            regex,
+            self._circom_max_input_size,
+            self._template_name,
+            self._link_path,
+            self._optimization,
+            self._use_witnesscalc,
+            self._run_the_prover,
+            self._ptau_path,
+        ]
+        if self._run_the_prover:
+            # The zkey is set up by snarkjs from the ptau file, which may be
+            # replaced at the same path
+            try:
+                ptau_stat = os.stat(self._ptau_path)
+            except (OSError, TypeError) as e:
+                raise RegexCompileError(f"Error reading the ptau file: {e}")
+            key_fields += [
+                SnarkjsSubprocess.get_installed_version(),
+                ptau_stat.st_size,
+                ptau_stat.st_mtime_ns,
+            ]
+        return cache_entry_path(self._cache_dir, key_fields)
+
+    def _set_compiled_paths(self) -> None:
+        """
+        Point the runner to the compiled files in the working directory.
+        """
+        base_path = Path(self._dir_path)
+        self._circom_path = str(base_path / "regex.circom")
+        self._r1cs_path = str(base_path / "regex.r1cs")
+        if self._use_witnesscalc:
+            self._graph_path = str(base_path / "regex.graph.bin")
+        else:
+            self._wasm_path = str(base_path / "regex_js" / "regex.wasm")
+        if self._run_the_prover:
+            self._zkey_path = str(base_path / "regex.zkey")
+            self._vkey_path = str(base_path / "regex.vkey.json")
+
     def compile(self, regex: str) -> None:
         """
         Compile the regex.
         """
         logger.debug("Compiling regex starts")
+
+        cache_path = self._get_cache_path(regex)
+        if cache_path:
+            # The compiled files are never modified, so they are hard linked
+            # from and to the cache
+            with locked_cache_entry(cache_path):
+                if cache_path.exists():
+                    logger.debug("Loading compiled circuit from cache")
+                    shutil.copytree(
+                        cache_path,
+                        self._dir_path,
+                        copy_function=_link_or_copy,
+                        dirs_exist_ok=True,
+                    )
+                    self._set_compiled_paths()
+                else:
+                    self._compile_circuit(regex)
+                    store_in_cache(
+                        self._dir_path, cache_path, copy_function=_link_or_copy
+                    )
+        else:
+            self._compile_circuit(regex)
+        logger.debug("Compiling regex ends")
+
+    def _compile_circuit(self, regex: str) -> None:
+        """
+        Compile the regex to a circuit in the working directory.
+        """
         # Create JSON for the regex for zk-regex
         base_json = {"parts": []}
 
@@ -58,19 +225,14 @@ class CircomRunner(Runner):
             regex_parts = [{"regex_def": regex, "is_public": True}]
 
         base_json["parts"] = regex_parts
-        regex_json = json.dumps(base_json)
-
-        # Write the JSON to a temporary file
-        json_file_path = str(Path(self._dir_path) / "regex.json")
-        with open(json_file_path, "wb") as f:
-            f.write(regex_json.encode())
+        regex_json = json.dumps(base_json).encode()
 
         circom_file_path = str(Path(self._dir_path) / "regex.circom")
 
         # Call zk-regex to generate the circom code
         logger.debug("Generating circom code starts")
         ZkRegexSubprocess.compile_to_circom(
-            json_file_path, circom_file_path, self._template_name
+            regex_json, circom_file_path, self._template_name
         )
         logger.debug("Generating circom code ends")
 
@@ -84,80 +246,178 @@ class CircomRunner(Runner):
 
         self._circom_path = circom_file_path
 
-        # Compile the circom code to wasm
-        logger.debug("Compiling circom code starts")
-        self._wasm_path, self._r1cs_path = CircomSubprocess.compile(
-            circom_file_path, self._link_path
-        )
-        logger.debug("Compiling circom code ends")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # The native witness graph only needs the circom code, so build it
+            # while circom compiles the circuit if circom-witnesscalc is used
+            if self._use_witnesscalc:
+                graph_future = executor.submit(
+                    WitnesscalcSubprocess.build_graph, circom_file_path, self._link_path
+                )
 
-        # Also setup the proving and verification key if the flag is set
-        if self._run_the_prover:
-            self._zkey_path = SnarkjsSubprocess.setup_zkey(
-                self._r1cs_path, self._ptau_path
+            # Compile the circom code, to wasm only if the witnesses are not
+            # generated natively from the graph
+            logger.debug("Compiling circom code starts")
+            self._wasm_path, self._r1cs_path = CircomSubprocess.compile(
+                circom_file_path,
+                self._link_path,
+                self._optimization,
+                wasm=not self._use_witnesscalc,
             )
-            self._vkey_path = SnarkjsSubprocess.export_verification_key(self._zkey_path)
-        logger.debug("Compiling regex ends")
+            logger.debug("Compiling circom code ends")
 
-    def match(self, input: str) -> tuple[bool, str]:
-        """
-        Match the regex on an input.
-        """
-        logger.debug("Matching regex starts")
-        # Convert input to list of decimal ASCII values and pad input with zeroes
-        numeric_input = [ord(c) for c in input] + [0] * (
-            self._circom_max_input_size - len(input)
-        )
-
-        # Write input to a temporary JSON file
-        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp_file:
-            tmp_file.write(json.dumps({"msg": numeric_input}).encode())
-            input_path = tmp_file.name
+            # Also setup the proving and verification key if the flag is set
+            if self._run_the_prover:
+                self._zkey_path = SnarkjsSubprocess.setup_zkey(
+                    self._r1cs_path, self._ptau_path
+                )
+                self._vkey_path = SnarkjsSubprocess.export_verification_key(
+                    self._zkey_path
+                )
 
-        self._input_path = input_path
+            if self._use_witnesscalc:
+                self._graph_path = graph_future.result()
 
-        # Skip if input is larger than circuit max input size
-        if len(numeric_input) > self._circom_max_input_size:
-            raise RegexRunError(f"Input too large for input: {len(numeric_input)}")
+    def _input_json(self, input: str) -> bytes:
+        """
+        Build the circuit input JSON of an input.
+        """
+        numeric_input = encode_circuit_input(input, self._circom_max_input_size)
+        return b'{"msg": [' + numeric_input + b"]}"
 
-        # Generate the witness
-        logger.debug("Generating witness starts")
-        witness_path = SnarkjsSubprocess.witness_gen(self._wasm_path, input_path)
-        logger.debug("Generating witness ends")
+    def _should_prove(self, input: str) -> bool:
+        """
+        Whether the input goes through the prover, which is much slower than
+        the witness generation, so it can be limited to a sample of the inputs.
+        """
+        return self._run_the_prover and is_sampled(input, self._prove_rate)
 
+    def _match_witness(self, witness_path: str, prove: bool) -> tuple[bool, str]:
+        """
+        Prove the witness if needed and extract the result of the match.
+        """
         # Also run the proving backend if the flag is set
-        if self._run_the_prover:
+        if prove:
             # Proving
-            proof, public_input = SnarkjsSubprocess.prove(self._zkey_path, witness_path)
+            if self._prover == "rapidsnark":
+                proof, public_input = RapidsnarkSubprocess.prove(
+                    self._zkey_path, witness_path
+                )
+            else:
+                proof, public_input = SnarkjsSubprocess.prove(
+                    self._zkey_path, witness_path
+                )
             # Verification
             if not SnarkjsSubprocess.verify(self._vkey_path, proof, public_input):
                 raise RegexRunError(
                     "Error running with SnarkJS: Proof verification failed"
                 )
 
-        # Extract from the witness the result of the match
-        result = SnarkjsSubprocess.extract_witness(witness_path)
+        # Read from the witness the result of the match and the substring
+        substr_length = self._circom_max_input_size
+        result = SnarkjsSubprocess.read_witness(witness_path, 1, substr_length + 2)
 
-        substr_length = len(numeric_input)
-        substr_output_numeric = result[2 : substr_length + 2]
-        substr_output = "".join([chr(int(c)) for c in substr_output_numeric])
-        substr_output = substr_output.strip("\x00")  # remove zero padding
+        substr_output = decode_circuit_output(result[1:])
 
         # Return the output of the match
-        output = int(result[1])
-        logger.debug("Matching regex ends")
+        output = result[0]
         return output == 1, substr_output
 
+    def _generate_witness(self, input_json: bytes, witness_path: str) -> str:
+        """
+        Generate the witness of an input JSON.
+        """
+        if self._use_witnesscalc:
+            return WitnesscalcSubprocess.witness_gen(
+                self._graph_path, input_json, witness_path
+            )
+        return SnarkjsSubprocess.witness_gen(self._wasm_path, input_json, witness_path)
+
+    def match(self, input: str) -> tuple[bool, str]:
+        """
+        Match the regex on an input.
+        """
+        if input in self._results:
+            return self._results[input]
+
+        logger.debug("Matching regex starts")
+
+        input_json = self._input_json(input)
+        witness_path = str(Path(self._get_inputs_dir()) / "input.wtns")
+
+        result = self._match_input(input_json, witness_path, self._should_prove(input))
+        self._results[input] = result
+        logger.debug("Matching regex ends")
+        return result
+
+    def _get_inputs_dir(self) -> str:
+        """
+        Directory for the witness and proof files. They are only read
+        back once, so they are kept on tmpfs even if the compiled circuit
+        is not, as long as it has room.
+        """
+        if not self._inputs_dir_path:
+            self._inputs_dir_path = make_temp_dir()
+        return self._inputs_dir_path
+
+    def _match_input(
+        self, input_json: bytes, witness_path: str, prove: bool
+    ) -> tuple[bool, str]:
+        """
+        Match the regex on an input JSON. The input JSON is handed to the
+        witness generator directly, only the witness is written to a file.
+        """
+        witness_path = self._generate_witness(input_json, witness_path)
+        return self._match_witness(witness_path, prove)
+
+    def _match_batch(self, inputs: list[str]) -> Iterator[tuple[bool, str]]:
+        """
+        Match the regex on a batch of inputs, running the witness generation
+        and proving of different inputs concurrently.
+        """
+        logger.debug("Matching regex on many inputs starts")
+        input_dir = Path(self._get_inputs_dir())
+
+        input_jsons = []
+        for input in inputs:
+            try:
+                input_jsons.append(self._input_json(input))
+            except RegexRunError as e:
+                e.input = input
+                raise
+
+        # The tools wait on their own processes, so threads are enough to
+        # keep the cores of this worker process busy
+        executor = ThreadPoolExecutor(max_workers=self._threads)
+        try:
+            futures = [
+                executor.submit(
+                    self._match_input,
+                    input_json,
+                    str(input_dir / f"input_{i}.wtns"),
+                    self._should_prove(input),
+                )
+                for i, (input, input_json) in enumerate(zip(inputs, input_jsons))
+            ]
+            for future in futures:
+                yield future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+        logger.debug("Matching regex on many inputs ends")
+
     def clean(self):
         # Remove all temporary files
         if Path(self._dir_path).exists():
             shutil.rmtree(self._dir_path)
+        if self._inputs_dir_path:
+            shutil.rmtree(self._inputs_dir_path, ignore_errors=True)
 
     def save(self, path) -> str:
         base_path = Path(self._dir_path)
         target_path = Path(path).resolve()
 
         dst_path = target_path / f"output_{base_path.stem}"
-        base_path.replace(dst_path)
+        # The directory may be on tmpfs, so it can't always be renamed
+        shutil.move(base_path, dst_path)
 
         return str(dst_path)
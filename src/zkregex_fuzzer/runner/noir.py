@@ -2,18 +2,33 @@
 Runner for Circom.
 """
 
+import functools
 import json
+import queue
 import shutil
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator
 
 from zkregex_fuzzer.logger import logger
-from zkregex_fuzzer.runner.base_runner import RegexRunError, Runner
+from zkregex_fuzzer.runner.base_runner import (
+    RegexRunError,
+    Runner,
+    decode_circuit_output,
+    encode_circuit_input,
+)
 from zkregex_fuzzer.runner.subprocess import (
     BarretenbergSubprocess,
     NoirSubprocess,
     ZkRegexSubprocess,
 )
+from zkregex_fuzzer.utils import (
+    cache_entry_path,
+    is_sampled,
+    locked_cache_entry,
+    make_temp_dir,
+    store_in_cache,
+)
 
 NOIR_MAIN_TEMPLATE = """
 fn main(input: [u8; MAX_INPUT_SIZE]) -> pub [Field; MAX_INPUT_SIZE] {
@@ -30,6 +45,21 @@ fn main(input: [u8; MAX_INPUT_SIZE]) -> pub [Field; MAX_INPUT_SIZE] {
 }
 """
 
+NARGO_TOML = (
+    b'[package]\nname = "test_regex"\ntype = "bin"\nauthors = [""]\n\n[dependencies]'
+)
+
+
+@functools.cache
+def _main_source(max_input_size: int) -> bytes:
+    """
+    Source of src/main.nr, which only depends on the max input size.
+    """
+    main_func = "mod regex;\n\n"
+    main_func += f"global MAX_INPUT_SIZE: u32 = {max_input_size};\n\n"
+    main_func += NOIR_MAIN_TEMPLATE
+    return main_func.encode()
+
 
 class NoirRunner(Runner):
     """
@@ -37,11 +67,22 @@ class NoirRunner(Runner):
     """
 
     def __init__(self, regex: str, kwargs: dict):
-        self._path = tempfile.TemporaryDirectory(delete=False).name
+        self._path = make_temp_dir()
+        # Copies of the working directory for concurrent matches
+        self._workspaces: list[str] = []
 
         self._run_the_prover = kwargs.get("noir_prove", False)
+        self._prove_rate = kwargs.get("noir_prove_rate", 1.0)
         self._noir_max_input_size = kwargs.get("max_input_size", 200)
-        super().__init__(regex, kwargs)
+        self._threads = kwargs.get("runner_threads", 1)
+        self._cache_dir = kwargs.get("noir_cache_dir", None)
+        try:
+            super().__init__(regex, kwargs)
+        except Exception:
+            # The working directory was already created, remove it as no
+            # one else will
+            self.clean()
+            raise
         self._runner = "Noir"
         self.identifer = ""
 
@@ -49,30 +90,64 @@ class NoirRunner(Runner):
         dir_path = Path(self._path)
 
         # create nargo.toml
-        with open(dir_path / "Nargo.toml", "w") as f:
-            content = '[package]\nname = "test_regex"\ntype = "bin"\nauthors = [""]\n\n[dependencies]'
-            f.write(content)
+        with open(dir_path / "Nargo.toml", "wb", buffering=0) as f:
+            f.write(NARGO_TOML)
 
         src_path = dir_path / "src"
         src_path.mkdir()
 
         # create src/main.nr
-        with open(src_path / "main.nr", "w") as f:
-            main_func = "mod regex;\n\n"
-            main_func += (
-                f"global MAX_INPUT_SIZE: u32 = {self._noir_max_input_size};\n\n"
-            )
-            main_func += NOIR_MAIN_TEMPLATE
-            f.write(main_func)
+        with open(src_path / "main.nr", "wb", buffering=0) as f:
+            f.write(_main_source(self._noir_max_input_size))
 
         return str(src_path)
 
+    def _get_cache_path(self, regex: str) -> Path | None:
+        """
+        Return the cache entry for the compiled circuit of the regex,
+        or None if caching is disabled.
+        """
+        if not self._cache_dir:
+            return None
+
+        # Everything that changes the produced files is part of the key,
+        # including the tools so that upgrading them invalidates the cache
+        key_fields = [
+            ZkRegexSubprocess.get_installed_version(),
+            NoirSubprocess.get_installed_version(),
+            BarretenbergSubprocess.get_installed_version()
+            if self._run_the_prover
+            else None,
+            regex,
+            self._noir_max_input_size,
+        ]
+        return cache_entry_path(self._cache_dir, key_fields)
+
     def compile(self, regex: str) -> None:
         """
         Compile the regex.
         """
         logger.debug("Compiling regex starts")
 
+        cache_path = self._get_cache_path(regex)
+        if cache_path:
+            # nargo rewrites the compiled program in place when executing,
+            # so the files are copied rather than linked
+            with locked_cache_entry(cache_path):
+                if cache_path.exists():
+                    logger.debug("Loading compiled circuit from cache")
+                    shutil.copytree(cache_path, self._path, dirs_exist_ok=True)
+                else:
+                    self._compile_circuit(regex)
+                    store_in_cache(self._path, cache_path)
+        else:
+            self._compile_circuit(regex)
+        logger.debug("Compiling regex ends")
+
+    def _compile_circuit(self, regex: str) -> None:
+        """
+        Compile the regex to a circuit in the working directory.
+        """
         # Setup main directory
         src_path = self._construct_working_dir()
 
@@ -89,18 +164,13 @@ class NoirRunner(Runner):
             regex_parts = [{"regex_def": regex, "is_public": True}]
 
         base_json["parts"] = regex_parts
-        regex_json = json.dumps(base_json)
-
-        # Write the JSON to a temporary file
-        json_file_path = str(Path(self._path) / "regex.json")
-        with open(json_file_path, "wb") as f:
-            f.write(regex_json.encode())
+        regex_json = json.dumps(base_json).encode()
 
         noir_file_path = str(Path(src_path) / "regex.nr")
 
         # Call zk-regex to generate the noir code
         logger.debug("Generating noir code starts")
-        ZkRegexSubprocess.compile_to_noir(json_file_path, noir_file_path)
+        ZkRegexSubprocess.compile_to_noir(regex_json, noir_file_path)
         logger.debug("Generating noir code ends")
 
         # Compile the noir code (nargo check)
@@ -111,59 +181,135 @@ class NoirRunner(Runner):
         if self._run_the_prover:
             BarretenbergSubprocess.export_verification_key(self._path)
 
-        logger.debug("Compiling regex ends")
-
-    def match(self, input: str) -> tuple[bool, str]:
+    def _execute(
+        self,
+        input: str,
+        path: str,
+        prover_name: str = "Prover",
+        witness_name: str | None = None,
+    ) -> tuple[bool, str]:
         """
-        Match the regex on an input.
+        Write the prover input of an input and execute the circuit on it in
+        the workspace at path.
         """
+        numeric_input = encode_circuit_input(input, self._noir_max_input_size)
 
-        logger.debug("Matching regex starts")
-        # Convert input to list of decimal ASCII values and pad input with zeroes
-        numeric_input = [ord(c) for c in input] + [0] * (
-            self._noir_max_input_size - len(input)
-        )
-
-        # Write input to a Prover.toml
-        with open(Path(self._path) / "Prover.toml", "w") as f:
-            f.write(f"input = {str(numeric_input)}")
-
-        # Skip if input is larger than noir max input size
-        if len(numeric_input) > self._noir_max_input_size:
-            raise RegexRunError("Input too large for input: {len(numeric_input)}")
+        # Write input to a Prover.toml, unbuffered in a single call
+        with open(Path(path) / f"{prover_name}.toml", "wb", buffering=0) as f:
+            f.write(b"input = [" + numeric_input + b"]")
 
         # Generate the witness
         logger.debug("Generating witness starts")
-        outputs = NoirSubprocess.witness_gen(self._path)
+        outputs = NoirSubprocess.witness_gen(path, prover_name, witness_name)
         is_match = len(outputs) > 0
         logger.debug("Generating witness ends")
 
-        if self._run_the_prover and is_match:
-            # prove
-            BarretenbergSubprocess.prove(self._path)
-            # verify
-            if not BarretenbergSubprocess.verify(self._path):
-                raise RegexRunError(
-                    "Error running with Barretenberg: Proof verification failed"
-                )
+        substr_output = decode_circuit_output(outputs)
 
-        # Convert the output to a string
-        substr_output_numeric = outputs
-        substr_output = "".join([chr(int(c)) for c in substr_output_numeric])
-        substr_output = substr_output.strip("\x00")  # remove zero padding
+        return is_match, substr_output
+
+    def _should_prove(self, input: str, is_match: bool) -> bool:
+        """
+        Whether a matched input goes through the prover, which is much slower
+        than executing, so it can be limited to a sample of the inputs.
+        """
+        return self._run_the_prover and is_match and is_sampled(input, self._prove_rate)
+
+    def _prove(
+        self, path: str, witness_name: str | None = None, proof_name: str = "proof"
+    ):
+        """
+        Prove and verify a witness generated in the workspace at path.
+        """
+        BarretenbergSubprocess.prove(path, witness_name, proof_name)
+        if not BarretenbergSubprocess.verify(path, proof_name):
+            raise RegexRunError(
+                "Error running with Barretenberg: Proof verification failed"
+            )
+
+    def match(self, input: str) -> tuple[bool, str]:
+        """
+        Match the regex on an input.
+        """
+        if input in self._results:
+            return self._results[input]
 
+        logger.debug("Matching regex starts")
+        is_match, substr_output = self._execute(input, self._path)
+
+        if self._should_prove(input, is_match):
+            self._prove(self._path)
+
+        self._results[input] = (is_match, substr_output)
+        logger.debug("Matching regex ends")
         return is_match, substr_output
 
+    def _get_workspaces(self, count: int) -> list[str]:
+        """
+        Return count workspaces with the compiled circuit, copying the
+        working directory for the ones beyond it. nargo writes the compiled
+        program into the workspace when executing, so concurrent matches
+        need their own.
+        """
+        while len(self._workspaces) < count - 1:
+            path = make_temp_dir()
+            shutil.copytree(
+                self._path,
+                path,
+                ignore=shutil.ignore_patterns("Prover*.toml", "*.gz", "proof*"),
+                dirs_exist_ok=True,
+            )
+            self._workspaces.append(path)
+        return [self._path] + self._workspaces[: count - 1]
+
+    def _match_batch(self, inputs: list[str]) -> Iterator[tuple[bool, str]]:
+        """
+        Match the regex on a batch of inputs, running the matches of
+        different inputs concurrently, each in a free workspace.
+        """
+        logger.debug("Matching regex on many inputs starts")
+        workspaces = queue.SimpleQueue()
+        for path in self._get_workspaces(min(len(inputs), self._threads)):
+            workspaces.put(path)
+
+        def match_in_workspace(i: int, input: str) -> tuple[bool, str]:
+            path = workspaces.get()
+            try:
+                result = self._execute(input, path, f"Prover_{i}", f"witness_{i}")
+                if self._should_prove(input, result[0]):
+                    self._prove(path, f"witness_{i}", f"proof_{i}")
+                return result
+            finally:
+                workspaces.put(path)
+
+        # nargo and bb run in their own processes, so threads are enough
+        executor = ThreadPoolExecutor(max_workers=workspaces.qsize())
+        try:
+            futures = [
+                executor.submit(match_in_workspace, i, input)
+                for i, input in enumerate(inputs)
+            ]
+            for future in futures:
+                yield future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+        logger.debug("Matching regex on many inputs ends")
+
     def clean(self):
         # Remove all temporary files
         if Path(self._path).exists():
             shutil.rmtree(self._path)
+        for path in self._workspaces:
+            shutil.rmtree(path, ignore_errors=True)
+        self._workspaces = []
 
     def save(self, path) -> str:
         base_path = Path(self._path)
         target_path = Path(path).resolve()
 
         dst_path = target_path / f"output_{base_path.stem}"
-        base_path.replace(dst_path)
+        # The target may be on another filesystem, so it can't always be renamed
+        shutil.move(base_path, dst_path)
 
         return str(dst_path)
@@ -2,10 +2,20 @@
 Runner for Python re module.
 """
 
+import functools
 import re
 
 from zkregex_fuzzer.runner.base_runner import RegexCompileError, RegexRunError, Runner
-from zkregex_fuzzer.utils import python_substring
+from zkregex_fuzzer.utils import compile_substring_parts, substring_of_parts
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_compile(pattern: str) -> re.Pattern:
+    """
+    Compile a pattern once for all the runners of a fuzzing run, as re's own
+    cache only keeps a few hundred patterns.
+    """
+    return re.compile(pattern)
 
 
 class PythonReRunner(Runner):
@@ -21,8 +31,10 @@ class PythonReRunner(Runner):
         """
         Compile the regex.
         """
+        # The substring parts are compiled on the first match
+        self._substring_parts = None
         try:
-            self._compiled_regex = re.compile(regex)
+            self._compiled_regex = _cached_compile(regex)
         except re.error as e:
             raise RegexCompileError(f"Error compiling regex: {e}")
 
@@ -34,7 +46,9 @@ class PythonReRunner(Runner):
             match_input = self._compiled_regex.match(input)
             match_success = match_input is not None
             if match_success:
-                str_result = python_substring(self._regex, input)
+                if self._substring_parts is None:
+                    self._substring_parts = compile_substring_parts(self._regex)
+                str_result = substring_of_parts(self._substring_parts, input)
                 return (match_success, str_result)
             return (match_success, "")
         except re.error as e:
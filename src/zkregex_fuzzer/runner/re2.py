@@ -0,0 +1,67 @@
+"""
+Runner for the RE2 regex engine (google-re2).
+"""
+
+from zkregex_fuzzer.runner.base_runner import RegexCompileError, RegexRunError, Runner
+from zkregex_fuzzer.utils import compile_substring_parts, substring_of_parts
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+
+class Re2Runner(Runner):
+    """
+    Runner that uses RE2, which matches in linear time like the automata
+    of zk-regex, instead of backtracking like the Python re module.
+    """
+
+    def __init__(self, regex: str, kwargs: dict):
+        super().__init__(regex, kwargs)
+        self._runner = "RE2"
+
+    @classmethod
+    def get_installed_version(cls) -> str:
+        """
+        Check that the google-re2 package is installed.
+        """
+        if re2 is None:
+            raise ValueError("google-re2 is not installed")
+        return "google-re2"
+
+    def compile(self, regex: str) -> None:
+        """
+        Compile the regex.
+        """
+        # The substring parts are compiled on the first match
+        self._substring_parts = None
+        if re2 is None:
+            raise RegexCompileError("google-re2 is not installed")
+        try:
+            self._compiled_regex = re2.compile(regex)
+        except re2.error as e:
+            raise RegexCompileError(f"Error compiling regex: {e}")
+
+    def match(self, input: str) -> tuple[bool, str]:
+        """
+        Match the regex on an input.
+        """
+        try:
+            match_success = self._compiled_regex.match(input) is not None
+            if match_success:
+                if self._substring_parts is None:
+                    self._substring_parts = compile_substring_parts(
+                        self._regex, engine=re2
+                    )
+                str_result = substring_of_parts(self._substring_parts, input)
+                return (match_success, str_result)
+            return (match_success, "")
+        except re2.error as e:
+            raise RegexRunError(f"Error matching regex: {e}")
+
+    def save(self, path: str) -> str:
+        return ""
+
+    def clean(self) -> None:
+        return None
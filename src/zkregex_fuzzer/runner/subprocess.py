@@ -1,23 +1,443 @@
+import atexit
+import functools
+import itertools
 import json
+import logging
+import mmap
+import os
 import re
 import shutil
+import struct
 import subprocess
+import threading
+from concurrent.futures import Future
 from pathlib import Path
 
 from zkregex_fuzzer.logger import logger
 
 from .base_runner import RegexCompileError, RegexRunError
 
+# JSON-lines loop serving snarkjs commands from a single Node.js process.
+# Requests are `[id, command, ...args]` and responses `{"id": id, "result": ...}`
+# or `{"id": id, "error": ...}`, one per line; a first "ready" line signals that
+# snarkjs could be loaded.
+SNARKJS_WORKER_SCRIPT = """
+const fs = require("fs");
+const path = require("path");
+const readline = require("readline");
+const snarkjs = require("snarkjs");
+
+// stdout is reserved for the responses, circuits may log with console.log
+const write = process.stdout.write.bind(process.stdout);
+console.log = console.error;
+
+function stringify(value) {
+    return JSON.stringify(value, (_, v) => (typeof v === "bigint" ? v.toString() : v));
+}
+
+function readJson(path) {
+    return JSON.parse(fs.readFileSync(path, "utf8"));
+}
+
+// Return the value loaded from a file, keeping the values of the recently
+// used files and loading them again when the file changes
+function cached(cache, maxSize, file, load) {
+    const stat = fs.statSync(file);
+    const version = `${stat.ino}:${stat.mtimeMs}`;
+    let entry = cache.get(file);
+    cache.delete(file);
+    if (!entry || entry.version !== version) {
+        entry = { version, value: load() };
+    }
+    cache.set(file, entry);
+    if (cache.size > maxSize) {
+        cache.delete(cache.keys().next().value);
+    }
+    return entry.value;
+}
+
+// Witness calculators of the recently used circuits, so that the wasm of a
+// circuit is instantiated once instead of for every witness
+const calculators = new Map();
+const MAX_CALCULATORS = 8;
+// Proving keys are large, so only the one of the current circuit is kept
+const zkeys = new Map();
+const MAX_ZKEYS = 1;
+const vkeys = new Map();
+const MAX_VKEYS = 8;
+
+function getCalculator(wasm) {
+    return cached(calculators, MAX_CALCULATORS, wasm, () => {
+        // circom generates the witness calculator next to the wasm
+        const builderPath = path.join(path.dirname(wasm), "witness_calculator.js");
+        const builder = require(builderPath);
+        delete require.cache[builderPath];
+        return { instance: builder(fs.readFileSync(wasm)), queue: Promise.resolve() };
+    });
+}
+
+function calculateWitness(wasm, inputJson, wtns) {
+    const input = JSON.parse(inputJson);
+    if (!fs.existsSync(path.join(path.dirname(wasm), "witness_calculator.js"))) {
+        return snarkjs.wtns.calculate(input, wasm, wtns);
+    }
+    const calculator = getCalculator(wasm);
+    // A calculator computes one witness at a time
+    const run = calculator.queue.then(async () => {
+        const wc = await calculator.instance;
+        fs.writeFileSync(wtns, await wc.calculateWTNSBin(input, true));
+    });
+    calculator.queue = run.catch(() => {});
+    return run;
+}
+
+const commands = {
+    "groth16 setup": (r1cs, ptau, zkey) => snarkjs.zKey.newZKey(r1cs, ptau, zkey),
+    "zkey export verificationkey": async (zkey, vkeyPath) =>
+        fs.writeFileSync(vkeyPath, stringify(await snarkjs.zKey.exportVerificationKey(zkey))),
+    "wtns calculate": calculateWitness,
+    "groth16 prove": async (zkey, wtns, proofPath, publicPath) => {
+        const zkeyFile = cached(zkeys, MAX_ZKEYS, zkey, () => ({
+            type: "mem",
+            data: fs.readFileSync(zkey),
+        }));
+        const { proof, publicSignals } = await snarkjs.groth16.prove(zkeyFile, wtns);
+        fs.writeFileSync(proofPath, stringify(proof));
+        fs.writeFileSync(publicPath, stringify(publicSignals));
+    },
+    "groth16 verify": (vkey, publicPath, proofPath) =>
+        snarkjs.groth16.verify(
+            cached(vkeys, MAX_VKEYS, vkey, () => readJson(vkey)),
+            readJson(publicPath),
+            readJson(proofPath),
+        ),
+};
+
+async function handle(line) {
+    const [id, command, ...args] = JSON.parse(line);
+    try {
+        const result = await commands[command](...args);
+        write(stringify({ id, result: result === undefined ? null : result }) + "\\n");
+    } catch (err) {
+        write(stringify({ id, error: String(err) }) + "\\n");
+    }
+}
+
+// Requests are handled concurrently, so a proof can be computed while the
+// witness of the next input is generated
+const lines = readline.createInterface({ input: process.stdin });
+lines.on("line", handle);
+lines.on("close", () => process.exit(0));
+write("ready\\n");
+"""
+
+
+# Public output printed by the Noir main function
+_NOIR_OUTPUT_RE = re.compile(rb"output: \[([^\]]+)\]")
+
+
+@functools.cache
+def _node_env() -> dict[str, str]:
+    """
+    Environment for Node.js scripts that require the globally installed snarkjs.
+    """
+    env = dict(os.environ)
+    if _which("npm"):
+        result = subprocess.run(
+            ["npm", "root", "-g"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        if result.returncode == 0:
+            node_path = [result.stdout.strip()]
+            if env.get("NODE_PATH"):
+                node_path.append(env["NODE_PATH"])
+            env["NODE_PATH"] = os.pathsep.join(node_path)
+    return env
+
+
+@functools.cache
+def _which(tool: str) -> str | None:
+    """
+    Path of a tool in PATH, or None if it is not installed. Looked up once
+    instead of on every run.
+    """
+    return shutil.which(tool)
+
+
+def _resolve(tool: str) -> str:
+    """
+    Absolute path of a tool to run it.
+    """
+    return _which(tool) or tool
+
+
+def _run(
+    cmd: list[str],
+    need_stdout: bool = False,
+    cwd: str | None = None,
+    input: bytes | None = None,
+) -> subprocess.CompletedProcess:
+    """
+    Run a tool, discarding its stdout unless needed. The output is kept as
+    bytes, callers only decode it when they use it.
+    """
+    return subprocess.run(
+        [_resolve(cmd[0]), *cmd[1:]],
+        input=input,
+        stdout=subprocess.PIPE if need_stdout else subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+    )
+
+
+def _decode(output: bytes) -> str:
+    return output.decode(errors="replace")
+
+
+def _log_command(cmd: list[str]) -> None:
+    """
+    Log a command, without building the message when debug logging is off.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(" ".join(cmd))
+
+
+class SnarkjsWorker:
+    """
+    Long-lived Node.js processes with snarkjs loaded, so that the snarkjs
+    commands run while compiling and matching do not pay the Node.js startup
+    each time. Commands can be sent from several threads and run
+    concurrently. A process computes one witness at a time, so more
+    processes are started while all of them are busy, up to the thread
+    budget of the runner (see configure).
+    """
+
+    _processes: list[subprocess.Popen] = []
+    _max_processes = 1
+    # Seconds to wait for a command before killing its worker, None to wait forever
+    _timeout: float | None = None
+    # Python process that started the workers, as forked processes can't share them
+    _owner_pid: int | None = None
+    _available: bool | None = None
+    # Requests waiting for a response, by worker process and id
+    _pending: dict[subprocess.Popen, dict[int, Future]] = {}
+    # Workers being started outside the lock
+    _spawning = 0
+    _ids = itertools.count()
+    _lock = threading.Condition()
+
+    @classmethod
+    def configure(cls, max_processes: int, timeout: float | None = None):
+        """
+        Set the number of worker processes and the timeout of the commands.
+        """
+        with cls._lock:
+            cls._max_processes = max(1, max_processes)
+            cls._timeout = timeout
+
+    @classmethod
+    def _start(cls):
+        cls._owner_pid = os.getpid()
+        cls._processes = []
+        cls._pending = {}
+        cls._spawning = 0
+        process = cls._spawn() if _which("node") else None
+        cls._available = process is not None
+        if cls._available:
+            cls._register(process)
+            atexit.register(cls.close)
+        else:
+            logger.debug("snarkjs worker could not load snarkjs, using the CLI")
+
+    @classmethod
+    def _spawn(cls) -> subprocess.Popen | None:
+        """
+        Start a worker process, or return None if it could not load snarkjs.
+        """
+        process = subprocess.Popen(
+            ["node", "-e", SNARKJS_WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            env=_node_env(),
+        )
+        if process.stdout.readline().strip() != "ready":
+            process.wait()
+            return None
+        return process
+
+    @classmethod
+    def _register(cls, process: subprocess.Popen):
+        """
+        Make a started worker available to the commands. Called with the lock held.
+        """
+        pending = {}
+        cls._processes.append(process)
+        cls._pending[process] = pending
+        threading.Thread(
+            target=cls._read_responses, args=(process, pending), daemon=True
+        ).start()
+
+    @classmethod
+    def _read_responses(cls, process: subprocess.Popen, pending: dict[int, Future]):
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+                id = response["id"]
+            except (ValueError, TypeError, KeyError):
+                # Not a response, like a warning printed by a Node.js module
+                logger.debug(f"snarkjs worker output: {line.rstrip()}")
+                continue
+            future = pending.pop(id, None)
+            if future is None:
+                continue
+            if "error" in response:
+                future.set_exception(
+                    RegexRunError(f"Error running with SnarkJS: {response['error']}")
+                )
+            else:
+                future.set_result(response["result"])
+
+        returncode = process.wait()
+        process.stdout.close()
+        with cls._lock:
+            # The next commands go to the other workers or a new one
+            if process in cls._processes:
+                cls._processes.remove(process)
+            cls._pending.pop(process, None)
+            for future in pending.values():
+                future.set_exception(
+                    RegexRunError(
+                        f"Error running with SnarkJS: worker exited with {returncode}"
+                    )
+                )
+            pending.clear()
+
+    @classmethod
+    def _pick_process(cls) -> subprocess.Popen | None:
+        """
+        Return an idle worker, starting one if all are busy and the budget
+        allows it, or else the least busy one. Called with the lock held,
+        which is released while a worker starts so that the commands of the
+        other threads are not blocked meanwhile.
+        """
+        while True:
+            for process in cls._processes:
+                if not cls._pending[process]:
+                    return process
+            if len(cls._processes) + cls._spawning < cls._max_processes:
+                cls._spawning += 1
+                cls._lock.release()
+                process = None
+                try:
+                    process = cls._spawn()
+                finally:
+                    cls._lock.acquire()
+                    cls._spawning -= 1
+                    cls._lock.notify_all()
+                if process is not None:
+                    cls._register(process)
+                    return process
+            elif not cls._processes and cls._spawning:
+                # Wait for the workers being started by other threads
+                cls._lock.wait()
+                continue
+            if not cls._processes:
+                return None
+            return min(cls._processes, key=lambda process: len(cls._pending[process]))
+
+    @classmethod
+    def _kill(cls, process: subprocess.Popen):
+        """
+        Kill a worker that stopped responding. Its pending commands fail once
+        the response reader sees it exit.
+        """
+        with cls._lock:
+            if process in cls._processes:
+                cls._processes.remove(process)
+        process.kill()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """
+        Start the worker if needed and check that it could load snarkjs.
+        """
+        with cls._lock:
+            if cls._owner_pid != os.getpid():
+                cls._start()
+            return cls._available
+
+    @classmethod
+    def call(cls, command: str, *args: str):
+        """
+        Run a snarkjs command in a worker and return its result.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"snarkjs worker: {command} {' '.join(args)}")
+        future = Future()
+        with cls._lock:
+            process = cls._pick_process()
+            if process is None:
+                raise RegexRunError("Error running with SnarkJS: worker exited")
+
+            request_id = next(cls._ids)
+            pending = cls._pending[process]
+            pending[request_id] = future
+            try:
+                process.stdin.write(json.dumps([request_id, command, *args]) + "\n")
+                process.stdin.flush()
+            except OSError as e:
+                del pending[request_id]
+                raise RegexRunError(f"Error running with SnarkJS: {e}")
+
+        try:
+            return future.result(timeout=cls._timeout)
+        except TimeoutError:
+            # The worker may be stuck, and would keep running the command
+            # after the harness gave up on it
+            cls._kill(process)
+            raise RegexRunError(
+                f"Error running with SnarkJS: {command} timed out after {cls._timeout}s"
+            )
+
+    @classmethod
+    def close(cls):
+        """
+        Stop the workers.
+        """
+        if cls._owner_pid != os.getpid():
+            return
+
+        with cls._lock:
+            processes = cls._processes
+            cls._processes = []
+            cls._owner_pid = None
+
+        for process in processes:
+            process.stdin.close()
+        for process in processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
 
 class ZkRegexSubprocess:
     @classmethod
+    @functools.cache
     def get_installed_version(cls) -> str:
         """
         Get the installed version of zk-regex.
         """
-        if shutil.which("zk-regex"):
+        if _which("zk-regex"):
             cmd = ["zk-regex", "--version"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
             return result.stdout.strip()
         else:
             raise ValueError("zk-regex is not installed")
@@ -25,20 +445,20 @@ class ZkRegexSubprocess:
     @classmethod
     def compile_to_circom(
         cls,
-        json_file_path: str,
+        regex_json: bytes,
         output_file_path: str,
         template_name: str = "TestRegex",
         substr=True,
     ):
         """
         Compile a regex using zk-regex
-        into Circom circuit.
+        into Circom circuit. The regex JSON is piped to zk-regex.
         """
         cmd = [
             "zk-regex",
             "decomposed",
             "-d",
-            json_file_path,
+            "/dev/stdin",
             "-c",
             output_file_path,
             "-t",
@@ -46,28 +466,30 @@ class ZkRegexSubprocess:
             "-g",
             "true" if substr else "false",
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd, input=regex_json)
 
         if result.returncode != 0:
-            raise RegexCompileError(f"Error compiling with zk-regex: {result.stderr}")
+            raise RegexCompileError(
+                f"Error compiling with zk-regex: {_decode(result.stderr)}"
+            )
 
     @classmethod
     def compile_to_noir(
         cls,
-        json_file_path: str,
+        regex_json: bytes,
         output_file_path: str,
         template_name: str = "TestRegex",
         substr=True,
     ):
         """
         Compile a regex using zk-regex
-        into Noir circuit.
+        into Noir circuit. The regex JSON is piped to zk-regex.
         """
         cmd = [
             "zk-regex",
             "decomposed",
             "-d",
-            json_file_path,
+            "/dev/stdin",
             "--noir-file-path",
             output_file_path,
             "-t",
@@ -75,59 +497,147 @@ class ZkRegexSubprocess:
             "-g",
             "true" if substr else "false",
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd, input=regex_json)
 
         if result.returncode != 0:
-            raise RegexCompileError(f"Error compiling with zk-regex: {result.stderr}")
+            raise RegexCompileError(
+                f"Error compiling with zk-regex: {_decode(result.stderr)}"
+            )
 
 
 class CircomSubprocess:
     @classmethod
+    @functools.cache
     def get_installed_version(cls) -> str:
         """
         Get the installed version of Circom.
         """
-        if shutil.which("circom"):
+        if _which("circom"):
             cmd = ["circom", "--version"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
             return result.stdout.strip()
         else:
             raise ValueError("Circom is not installed")
 
     @classmethod
-    def compile(cls, circom_file_path: str, link_path: list[str]) -> tuple[str, str]:
+    def compile(
+        cls,
+        circom_file_path: str,
+        link_path: list[str],
+        optimization: str | None = None,
+        wasm: bool = True,
+    ) -> tuple[str, str]:
         """
-        Compile a circom file to r1cs and wasm.
+        Compile a circom file to r1cs and wasm, with circom's default
+        constraint simplification unless an optimization level is given.
+        The wasm witness generator can be skipped when witnesses are
+        generated natively, in which case the returned wasm path is empty.
         """
 
         base_name = Path(circom_file_path).stem
         base_dir = Path(circom_file_path).parent
 
-        cmd = ["circom", circom_file_path, "--wasm", "--r1cs", "-o", str(base_dir)]
+        cmd = ["circom", circom_file_path, "--r1cs", "-o", str(base_dir)]
+        if wasm:
+            cmd.append("--wasm")
+        if optimization:
+            cmd.append(f"--{optimization}")
         for path in link_path:
             cmd.append("-l")
             cmd.append(path)
 
-        logger.debug(" ".join(cmd))
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        _log_command(cmd)
+        result = _run(cmd)
 
         if result.returncode != 0:
-            raise RegexCompileError(f"Error compiling with Circom: {result.stderr}")
+            raise RegexCompileError(
+                f"Error compiling with Circom: {_decode(result.stderr)}"
+            )
 
         r1cs_file_path = base_dir / f"{base_name}.r1cs"
+        if not wasm:
+            return "", str(r1cs_file_path)
         wasm_file_path = base_dir / f"{base_name}_js/{base_name}.wasm"
         return str(wasm_file_path), str(r1cs_file_path)
 
 
+class WitnesscalcSubprocess:
+    @classmethod
+    @functools.cache
+    def get_installed_version(cls) -> str:
+        """
+        Check that the circom-witnesscalc binaries are installed.
+        """
+        if _which("build-circuit") and _which("calc-witness"):
+            return "circom-witnesscalc"
+        else:
+            raise ValueError("circom-witnesscalc is not installed")
+
+    @classmethod
+    def build_graph(cls, circom_file_path: str, link_path: list[str]) -> str:
+        """
+        Compile a circom file to a circom-witnesscalc witness graph.
+        """
+
+        base_name = Path(circom_file_path).stem
+        base_dir = Path(circom_file_path).parent
+        graph_path = str(base_dir / f"{base_name}.graph.bin")
+
+        cmd = ["build-circuit", circom_file_path, graph_path]
+        for path in link_path:
+            cmd.append("-l")
+            cmd.append(path)
+
+        _log_command(cmd)
+        result = _run(cmd)
+
+        if result.returncode != 0:
+            raise RegexCompileError(
+                f"Error compiling with circom-witnesscalc: {_decode(result.stderr)}"
+            )
+
+        return graph_path
+
+    @classmethod
+    def witness_gen(
+        cls, graph_path: str, input_json: bytes, output_path: str | None = None
+    ) -> str:
+        """
+        Generate a witness from the witness graph. The input JSON is piped
+        to calc-witness.
+        """
+
+        if output_path is None:
+            base_name = Path(graph_path).name.split(".")[0]
+            base_dir = Path(graph_path).parent
+            output_path = str(base_dir / f"{base_name}.wtns")
+
+        cmd = ["calc-witness", graph_path, "/dev/stdin", output_path]
+        result = _run(cmd, input=input_json)
+
+        _log_command(cmd)
+        if result.returncode != 0:
+            raise RegexRunError(
+                f"Error running with circom-witnesscalc: {_decode(result.stderr)}"
+            )
+
+        return output_path
+
+
 class SnarkjsSubprocess:
     @classmethod
+    @functools.cache
     def get_installed_version(cls) -> str:
         """
         Get the installed version of SnarkJS.
         """
-        if shutil.which("snarkjs"):
+        if _which("snarkjs"):
             cmd = ["snarkjs", "--help"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
             return result.stdout.split("\n")[0]
         else:
             raise ValueError("SnarkJS is not installed")
@@ -142,11 +652,15 @@ class SnarkjsSubprocess:
         base_dir = Path(circuit_path).parent
         output_path = str(base_dir / f"{base_name}.zkey")
 
+        if SnarkjsWorker.is_available():
+            SnarkjsWorker.call("groth16 setup", circuit_path, ptau_path, output_path)
+            return output_path
+
         cmd = ["snarkjs", "groth16", "setup", circuit_path, ptau_path, output_path]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd)
 
         if result.returncode != 0:
-            raise RegexRunError(f"Error running with SnarkJS: {result.stderr}")
+            raise RegexRunError(f"Error running with SnarkJS: {_decode(result.stderr)}")
 
         return str(output_path)
 
@@ -160,30 +674,51 @@ class SnarkjsSubprocess:
         base_dir = Path(zkey_path).parent
         output_path = str(base_dir / f"{base_name}.vkey.json")
 
+        if SnarkjsWorker.is_available():
+            SnarkjsWorker.call("zkey export verificationkey", zkey_path, output_path)
+            return output_path
+
         cmd = ["snarkjs", "zkey", "export", "verificationkey", zkey_path, output_path]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd, need_stdout=True)
 
         if result.returncode != 0:
-            raise RegexRunError(f"Error running with SnarkJS: {result.stdout}")
+            raise RegexRunError(f"Error running with SnarkJS: {_decode(result.stdout)}")
 
         return str(output_path)
 
     @classmethod
-    def witness_gen(cls, wasm_file_path: str, input_path: str) -> str:
+    def witness_gen(
+        cls, wasm_file_path: str, input_json: bytes, output_path: str | None = None
+    ) -> str:
         """
-        Generate a witness for the wasm file.
+        Generate a witness for the wasm file. The input JSON is sent along
+        with the command, or piped to the snarkjs CLI.
         """
 
-        base_name = Path(wasm_file_path).stem
-        base_dir = Path(wasm_file_path).parent
-        output_path = str(base_dir / f"{base_name}.wtns")
+        if output_path is None:
+            base_name = Path(wasm_file_path).stem
+            base_dir = Path(wasm_file_path).parent
+            output_path = str(base_dir / f"{base_name}.wtns")
 
-        cmd = ["snarkjs", "wtns", "calculate", wasm_file_path, input_path, output_path]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        if SnarkjsWorker.is_available():
+            SnarkjsWorker.call(
+                "wtns calculate", wasm_file_path, input_json.decode(), output_path
+            )
+            return output_path
 
-        logger.debug(" ".join(cmd))
+        cmd = [
+            "snarkjs",
+            "wtns",
+            "calculate",
+            wasm_file_path,
+            "/dev/stdin",
+            output_path,
+        ]
+        result = _run(cmd, need_stdout=True, input=input_json)
+
+        _log_command(cmd)
         if result.returncode != 0:
-            raise RegexRunError(f"Error running with SnarkJS: {result.stdout}")
+            raise RegexRunError(f"Error running with SnarkJS: {_decode(result.stdout)}")
 
         return str(output_path)
 
@@ -193,11 +728,19 @@ class SnarkjsSubprocess:
         geenrate proof from the witness with the zkey.
         """
 
-        base_name = Path(zkey_path).stem
-        base_dir = Path(zkey_path).parent
+        # Name the proof after the witness, so that proofs of different
+        # witnesses can be generated concurrently
+        base_name = Path(witness_path).stem
+        base_dir = Path(witness_path).parent
         proof_path = str(base_dir / f"{base_name}.proof.json")
         public_input_path = str(base_dir / f"{base_name}.public.json")
 
+        if SnarkjsWorker.is_available():
+            SnarkjsWorker.call(
+                "groth16 prove", zkey_path, witness_path, proof_path, public_input_path
+            )
+            return proof_path, public_input_path
+
         cmd = [
             "snarkjs",
             "groth16",
@@ -207,10 +750,10 @@ class SnarkjsSubprocess:
             proof_path,
             public_input_path,
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd, need_stdout=True)
 
         if result.returncode != 0:
-            raise RegexRunError(f"Error running with SnarkJS: {result.stdout}")
+            raise RegexRunError(f"Error running with SnarkJS: {_decode(result.stdout)}")
 
         return proof_path, public_input_path
 
@@ -220,6 +763,11 @@ class SnarkjsSubprocess:
         Verify the proof with the verification key.
         """
 
+        if SnarkjsWorker.is_available():
+            return SnarkjsWorker.call(
+                "groth16 verify", vkey_path, public_input_path, proof_path
+            )
+
         cmd = [
             "snarkjs",
             "groth16",
@@ -228,52 +776,103 @@ class SnarkjsSubprocess:
             public_input_path,
             proof_path,
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd, need_stdout=True)
 
         if result.returncode != 0:
-            raise RegexRunError(f"Error running with SnarkJS: {result.stdout}")
+            raise RegexRunError(f"Error running with SnarkJS: {_decode(result.stdout)}")
+
+        return b"OK" in result.stdout
+
+    @classmethod
+    def read_witness(cls, witness_path: str, start: int, end: int) -> list[int]:
+        """
+        Read the witness values in [start, end) from a binary .wtns file.
+
+        The file is made of sections, each prefixed with its type (u32) and
+        size (u64). Section 1 holds the field element size and the number of
+        values, section 2 the values themselves as little-endian integers.
+        """
+        try:
+            with open(witness_path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise RegexRunError(f"Error reading witness {witness_path}: {e}")
+
+        with data:
+            try:
+                magic, _, n_sections = struct.unpack_from("<4sII", data, 0)
+                sections = {}
+                offset = 12
+                for _ in range(n_sections):
+                    section_type, size = struct.unpack_from("<IQ", data, offset)
+                    offset += 12
+                    sections.setdefault(section_type, offset)
+                    offset += size
+
+                (n8,) = struct.unpack_from("<I", data, sections[1])
+                (n_witness,) = struct.unpack_from("<I", data, sections[1] + 4 + n8)
+                values_offset = sections[2]
+            except (struct.error, KeyError):
+                magic = None
+            if magic != b"wtns":
+                raise RegexRunError(f"Invalid witness file {witness_path}")
+
+            # Copy the requested values out of the map at once
+            end = min(end, n_witness)
+            values = data[values_offset + start * n8 : values_offset + end * n8]
+
+        return [
+            int.from_bytes(values[i : i + n8], "little")
+            for i in range(0, len(values), n8)
+        ]
 
-        return "OK" in result.stdout
 
+class RapidsnarkSubprocess:
     @classmethod
-    def extract_witness(cls, witness_path: str) -> dict:
+    @functools.cache
+    def get_installed_version(cls) -> str:
+        """
+        Check that the rapidsnark prover is installed.
+        """
+        if _which("rapidsnark"):
+            return "rapidsnark"
+        else:
+            raise ValueError("rapidsnark is not installed")
+
+    @classmethod
+    def prove(cls, zkey_path: str, witness_path: str) -> tuple[str, str]:
         """
-        Extract the witness from the witness file.
+        Generate a Groth16 proof from the witness with the zkey.
         """
 
         base_name = Path(witness_path).stem
-        output_path = str(Path(witness_path).parent / f"{base_name}.json")
+        base_dir = Path(witness_path).parent
+        proof_path = str(base_dir / f"{base_name}.proof.json")
+        public_input_path = str(base_dir / f"{base_name}.public.json")
 
-        cmd = [
-            "snarkjs",
-            "wtns",
-            "export",
-            "json",
-            witness_path,
-            output_path,
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        cmd = ["rapidsnark", zkey_path, witness_path, proof_path, public_input_path]
+        result = _run(cmd, need_stdout=True)
 
-        logger.debug(" ".join(cmd))
+        _log_command(cmd)
         if result.returncode != 0:
-            logger.debug(result.stdout)
-            raise RegexRunError(f"Error running with SnarkJS: {result.stdout}")
+            output = _decode(result.stdout) + _decode(result.stderr)
+            raise RegexRunError(f"Error proving with rapidsnark: {output}")
 
-        json_result = json.loads(open(output_path, "r").read())
-        Path(output_path).unlink()
-
-        return json_result
+        return proof_path, public_input_path
 
 
 class NoirSubprocess:
     @classmethod
+    @functools.cache
     def get_installed_version(cls) -> str:
         """
         Get the installed version of noir.
         """
-        if shutil.which("nargo"):
+        if _which("nargo"):
             cmd = ["nargo", "--version"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
             return result.stdout.split("\n")[0]
         else:
             raise ValueError("Noir (nargo) is not installed")
@@ -290,38 +889,49 @@ class NoirSubprocess:
             "--skip-underconstrained-check",
         ]
 
-        logger.debug(" ".join(cmd))
-        result = subprocess.run(cmd, capture_output=True, text=True, cwd=noir_dir_path)
+        _log_command(cmd)
+        result = _run(cmd, cwd=noir_dir_path)
 
         if result.returncode != 0:
-            raise RegexCompileError(f"Error compiling with Noir: {result.stderr}")
+            raise RegexCompileError(
+                f"Error compiling with Noir: {_decode(result.stderr)}"
+            )
 
     @staticmethod
-    def _extract_output(stdout: str) -> list:
+    def _extract_output(stdout: bytes) -> list:
         """
         Extract the output from the stdout.
         Currently, there is no known method from nargo CLI to extract
         only public output from the witness.
         """
-        match = re.search(r"output: \[([^\]]+)\]", stdout)
+        match = _NOIR_OUTPUT_RE.search(stdout)
         if match:
             hex_values = match.group(1)
             int_list = [
-                int(x, 16) for x in hex_values.split(", ")
+                int(x, 16) for x in hex_values.split(b", ")
             ]  # Convert hex to int
             return int_list
 
         return []
 
     @classmethod
-    def witness_gen(cls, noir_dir_path: str) -> list[int]:
+    def witness_gen(
+        cls,
+        noir_dir_path: str,
+        prover_name: str = "Prover",
+        witness_name: str | None = None,
+    ) -> list[int]:
         """
-        Generate witness with Noir.
+        Generate witness with Noir, from the inputs in `<prover_name>.toml`.
+        The witness is written to `target/<witness_name>.gz`, named after the
+        package by default.
         """
-        cmd = ["nargo", "execute", "--silence-warnings"]
+        cmd = ["nargo", "execute", "--silence-warnings", "--prover-name", prover_name]
+        if witness_name:
+            cmd.append(witness_name)
 
-        logger.debug(" ".join(cmd))
-        result = subprocess.run(cmd, capture_output=True, text=True, cwd=noir_dir_path)
+        _log_command(cmd)
+        result = _run(cmd, need_stdout=True, cwd=noir_dir_path)
 
         if result.returncode != 0:
             return []
@@ -331,13 +941,16 @@ class NoirSubprocess:
 
 class BarretenbergSubprocess:
     @classmethod
+    @functools.cache
     def get_installed_version(cls) -> str:
         """
         Get the installed version of Barretenberg.
         """
-        if shutil.which("bb"):
+        if _which("bb"):
             cmd = ["bb", "--version"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
             match = re.search(r"\b\d+\.\d+\.\d+\b", result.stdout)
             if match:
                 version = match.group()
@@ -357,23 +970,27 @@ class BarretenbergSubprocess:
         vk_path = str(Path(path) / "target/vk")
 
         cmd = ["bb", "write_vk", "-b", json_path, "-o", vk_path]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd)
 
         if result.returncode != 0:
-            raise RegexRunError(f"Error running with Barretenberg: {result.stderr}")
+            raise RegexRunError(
+                f"Error running with Barretenberg: {_decode(result.stderr)}"
+            )
 
         return vk_path
 
     @classmethod
-    def prove(cls, path: str) -> str:
+    def prove(
+        cls, path: str, witness_name: str | None = None, proof_name: str = "proof"
+    ) -> str:
         """
         generate proof from the witness.
         """
 
         base_path = Path(path)
         json_path = str(base_path / "target/test_regex.json")
-        gz_path = str(base_path / "target/test_regex.gz")
-        proof_path = str(base_path / "target/proof")
+        gz_path = str(base_path / f"target/{witness_name or 'test_regex'}.gz")
+        proof_path = str(base_path / f"target/{proof_name}")
 
         cmd = [
             "bb",
@@ -385,21 +1002,23 @@ class BarretenbergSubprocess:
             "-o",
             proof_path,
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd)
 
         if result.returncode != 0:
-            raise RegexRunError(f"Error proving with Barretenberg: {result.stderr}")
+            raise RegexRunError(
+                f"Error proving with Barretenberg: {_decode(result.stderr)}"
+            )
 
         return proof_path
 
     @classmethod
-    def verify(cls, path: str) -> bool:
+    def verify(cls, path: str, proof_name: str = "proof") -> bool:
         """
         Verify the proof with the verification key.
         """
 
         vkey_path = Path(path) / "target/vk"
-        proof_path = Path(path) / "target/proof"
+        proof_path = Path(path) / f"target/{proof_name}"
 
         cmd = [
             "bb",
@@ -409,10 +1028,10 @@ class BarretenbergSubprocess:
             "-p",
             proof_path,
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd)
 
         if result.returncode != 0:
-            logger.debug(result.stderr)
+            logger.debug(_decode(result.stderr))
             return False
 
         return True
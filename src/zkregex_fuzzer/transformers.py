@@ -2,18 +2,37 @@
 Implement transformes.
 
 * regex_to_grammar: transforms a regex to a grammar
+* unescape_grammar_output: turns a string generated from that grammar back
+  into a string of the regex
 
 TODO:
     - Add more tests
     - Fix linting errors
 """
 
+import functools
 import sre_parse
 import string
 from typing import Any, Dict, List, Tuple
 
 from fuzzingbook.Grammars import Expansion, Grammar
 
+# Characters generated for '.', built once instead of on every dot
+_DOT_EXPANSIONS = tuple(string.ascii_letters + string.digits)
+
+# Keys of the next rule index of each prefix and of the rules defined by
+# shared_rule_name, kept in the grammar while it is built and removed by
+# regex_to_grammar
+_RULE_COUNTERS = "__rule_counters__"
+_SHARED_RULES = "__shared_rules__"
+
+# Stand-ins for '<' and '>' in the expansions, as fuzzingbook reads any
+# '<...>' of the generated text as a nonterminal, even once expanded. They are
+# Unicode noncharacters, reserved for internal use, so they do not clash with
+# the characters of the regex.
+_ANGLE_ESCAPES = str.maketrans({"<": "\ufdd0", ">": "\ufdd1"})
+_ANGLE_UNESCAPES = str.maketrans({"\ufdd0": "<", "\ufdd1": ">"})
+
 
 def regex_to_grammar(regex: str) -> Grammar:
     """
@@ -49,10 +68,20 @@ def regex_to_grammar(regex: str) -> Grammar:
 
     # We'll parse that top-level token list into a single rule <REGEX_0>
     parse_tokens_into_rule(tokens, grammar, "<REGEX_0>")
+    grammar.pop(_RULE_COUNTERS, None)
+    grammar.pop(_SHARED_RULES, None)
 
     return grammar
 
 
+def unescape_grammar_output(output: str) -> str:
+    """
+    Restore the '<' and '>' of a string generated from a grammar built by
+    regex_to_grammar.
+    """
+    return output.translate(_ANGLE_UNESCAPES)
+
+
 def parse_tokens_into_rule(
     token_list: List[Tuple[Any, Any]], grammar: Grammar, rule_name: str
 ) -> None:
@@ -84,14 +113,14 @@ def parse_tokens_into_rule(
     literal_buffer: List[str] = []
 
     def flush_literal_buffer():
-        """If we have buffered chars, turn them into a new rule (or direct expansion)."""
+        """If we have buffered chars, turn them into a direct expansion."""
         if not literal_buffer:
             return None
         s = "".join(literal_buffer)
         literal_buffer.clear()
-        sub_rule = new_rule_name(grammar, "LIT")
-        grammar[sub_rule] = [s]
-        return sub_rule
+        # Inline the literal in the expansion, with '<' and '>' escaped so
+        # that they are not mistaken for a nonterminal, like in '<a>'
+        return s.translate(_ANGLE_ESCAPES)
 
     i = 0
     while i < len(token_list):
@@ -167,6 +196,8 @@ def parse_tokens_into_rule(
             # parse the repeated piece
             repeated_rule = new_rule_name(grammar, "REP")
             parse_tokens_into_rule(sub_tokens, grammar, repeated_rule)
+            # identical repeated pieces share one rule
+            repeated_rule = shared_rule_name(grammar, "REP", grammar.pop(repeated_rule))
             # produce expansions that unroll from min..max (with some clamp)
             rep_rule = handle_max_repeat(repeated_rule, min_count, max_count, grammar)
             expansion_parts.append(rep_rule)
@@ -215,14 +246,23 @@ def handle_in_class(token_list_in, grammar: Grammar) -> str:
     We gather possible chars, ignoring NEGATE or advanced stuff.
     Then define a new rule that enumerates those chars.
     """
+    # each char is a separate expansion
+    return shared_rule_name(grammar, "CLASS", class_chars(tuple(token_list_in)))
+
+
+@functools.lru_cache(maxsize=1024)
+def class_chars(token_list_in: Tuple[Tuple[Any, Any], ...]) -> Tuple[str, ...]:
+    """
+    Characters enumerated for a bracket class. Common classes like [0-9] or
+    [a-z] recur across regexes, so they are only expanded once.
+    """
     chars = []
     for in_op, val in token_list_in:
         if in_op == sre_parse.LITERAL:
             chars.append(chr(val))
         elif in_op == sre_parse.RANGE:
             (start, end) = val
-            for cp in range(start, end + 1):
-                chars.append(chr(cp))
+            chars.extend(map(chr, range(start, end + 1)))
         elif in_op == sre_parse.NEGATE:
             # e.g. [^...], not fully handled => skip or do partial
             pass
@@ -236,10 +276,7 @@ def handle_in_class(token_list_in, grammar: Grammar) -> str:
         # fallback
         chars = ["X"]
 
-    rule_name = new_rule_name(grammar, "CLASS")
-    # each char is a separate expansion
-    grammar[rule_name] = chars
-    return rule_name
+    return tuple(char.translate(_ANGLE_ESCAPES) for char in chars)
 
 
 def handle_dot(grammar: Grammar) -> str:
@@ -248,11 +285,8 @@ def handle_dot(grammar: Grammar) -> str:
     In Python, '.' typically matches all except newlines, but that might be too big.
     We'll pick a smaller set for demonstration.
     """
-    dot_rule = new_rule_name(grammar, "DOT")
     # For a quick example, let's do letters + digits
-    expansions = list(string.ascii_letters + string.digits)
-    grammar[dot_rule] = expansions
-    return dot_rule
+    return shared_rule_name(grammar, "DOT", _DOT_EXPANSIONS)
 
 
 def handle_max_repeat(
@@ -268,7 +302,6 @@ def handle_max_repeat(
     if max_count == sre_parse.MAXREPEAT:
         max_count = min_count + 3  # ad-hoc clamp
 
-    rep_rule = new_rule_name(grammar, prefix="MREP")
     expansions = []
     for count in range(min_count, max_count + 1):
         expansions.append(
@@ -278,15 +311,32 @@ def handle_max_repeat(
     if min_count == 0:
         expansions.append("")
 
-    grammar[rep_rule] = expansions
-    return rep_rule
+    return shared_rule_name(grammar, "MREP", expansions)
 
 
 # Utility for generating unique rule names
 def new_rule_name(grammar: Grammar, prefix="PART") -> str:
-    rule_count = 0
+    # Continue from the last index of the prefix instead of probing from 0,
+    # which also keeps names handed out before their rule is defined unique
+    counters = grammar.setdefault(_RULE_COUNTERS, {})
+    rule_count = counters.get(prefix, 0)
     while True:
         candidate = f"<{prefix}_{rule_count}>"
         rule_count += 1
         if candidate not in grammar:
+            counters[prefix] = rule_count
             return candidate
+
+
+def shared_rule_name(grammar: Grammar, prefix: str, expansions) -> str:
+    """
+    Return the rule of the prefix with these expansions, defining it the first
+    time, so that identical pieces of the regex share one rule.
+    """
+    shared = grammar.setdefault(_SHARED_RULES, {})
+    key = (prefix, tuple(expansions))
+    if key not in shared:
+        rule_name = new_rule_name(grammar, prefix)
+        grammar[rule_name] = list(expansions)
+        shared[key] = rule_name
+    return shared[key]
@@ -3,14 +3,22 @@ Utility functions for the regex fuzzer.
 """
 
 import concurrent.futures
+import contextlib
+import fcntl
+import hashlib
+import json
 import os
 import random
 import re
+import shutil
 import string
+import tempfile
 import threading
 import time
 import warnings
+import zlib
 from functools import wraps
+from pathlib import Path
 
 import psutil
 from fuzzingbook.Grammars import Grammar, simple_grammar_fuzzer
@@ -160,11 +168,91 @@ def get_random_filename():
     return "".join(random.choices(string.ascii_lowercase + string.digits, k=8))
 
 
+# Directory for the files written by the runners, which can be set with
+# ZKREGEX_FUZZER_TMPDIR (e.g. to a disk directory to save memory), otherwise
+# memory-backed if available
+_TMPFS_DIR_FROM_ENV = bool(os.environ.get("ZKREGEX_FUZZER_TMPDIR"))
+TMPFS_DIR = os.environ.get("ZKREGEX_FUZZER_TMPDIR") or (
+    "/dev/shm" if os.path.isdir("/dev/shm") else None
+)
+# Free space needed on tmpfs to also keep the compiled circuits there
+TMPFS_MIN_FREE = 1 << 30
+
+
+def make_temp_dir() -> str:
+    """
+    Create a temporary directory, in the directory set by the user or else
+    on tmpfs if it has room for a compiled circuit.
+    """
+    if TMPFS_DIR and (
+        _TMPFS_DIR_FROM_ENV or shutil.disk_usage(TMPFS_DIR).free >= TMPFS_MIN_FREE
+    ):
+        return tempfile.mkdtemp(dir=TMPFS_DIR)
+    return tempfile.mkdtemp()
+
+
+def runner_threads(process_num: int = 1) -> int:
+    """
+    Number of tool invocations a runner may run at once, sharing the cores
+    between the process_num worker processes.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, process_num))
+
+
+def cache_entry_path(cache_dir: str, key_fields: list) -> Path:
+    """
+    Return the path of the cache entry for the given key fields.
+    """
+    key = hashlib.sha256(json.dumps(key_fields).encode()).hexdigest()
+    return Path(cache_dir) / key
+
+
+@contextlib.contextmanager
+def locked_cache_entry(cache_path: Path):
+    """
+    Lock a cache entry, so that processes building the same entry wait for
+    the first one and load it instead of building it again.
+    """
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path.with_suffix(".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def store_in_cache(dir_path: str, cache_path: Path, copy_function=shutil.copy2) -> None:
+    """
+    Copy a directory into the cache.
+    """
+    # Copy into a staging directory first and rename it, so that other
+    # processes never see a partially written cache entry.
+    staging_path = tempfile.mkdtemp(dir=cache_path.parent)
+    try:
+        shutil.copytree(
+            dir_path, staging_path, copy_function=copy_function, dirs_exist_ok=True
+        )
+    except BaseException:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise
+    try:
+        os.replace(staging_path, cache_path)
+    except OSError:
+        # Another process cached the same entry in the meantime
+        shutil.rmtree(staging_path, ignore_errors=True)
+
+
+_PRETTY_REGEX_ESCAPES = str.maketrans({"\n": r"\n", "\r": r"\r"})
+
+
 def pretty_regex(regex: str):
     """
     Format raw string regex to printable chars
     """
-    return regex.replace("\n", r"\n").replace("\r", r"\r")
+    return regex.translate(_PRETTY_REGEX_ESCAPES)
+
+
+# Tokens of extract_parts: a run of characters without special meaning there,
+# a backslash run with the character it escapes, or a bracket or parenthesis
+_PARTS_TOKEN_RE = re.compile(r"[^\\\[\]()]+|\\+.?|[\[\]()]", re.DOTALL)
 
 
 def extract_parts(s: str) -> list[str]:
@@ -176,45 +264,39 @@ def extract_parts(s: str) -> list[str]:
     current_part = []
     in_char_class = False
     paren_depth = 0
-    prev_char = ""
-
-    for i, char in enumerate(s):
-        if prev_char == "\\":
-            current_part.append(char)
-            prev_char = char
-            continue
 
-        if char == "[" and not in_char_class and paren_depth == 0:
+    # Scan token by token, so that runs of plain characters are handled at
+    # once instead of character by character
+    for token in _PARTS_TOKEN_RE.findall(s):
+        if token == "[" and not in_char_class and paren_depth == 0:
             if current_part:
                 result.append("".join(current_part))
                 current_part = []
             in_char_class = True
-            current_part.append(char)
+            current_part.append(token)
 
-        elif char == "]" and in_char_class and prev_char != "\\":
-            current_part.append(char)
+        elif token == "]" and in_char_class:
+            current_part.append(token)
             in_char_class = False
             result.append("".join(current_part))
             current_part = []
 
-        elif char == "(" and not in_char_class:
+        elif token == "(" and not in_char_class:
             if paren_depth == 0 and current_part:
                 result.append("".join(current_part))
                 current_part = []
             paren_depth += 1
-            current_part.append(char)
+            current_part.append(token)
 
-        elif char == ")" and not in_char_class:
-            current_part.append(char)
+        elif token == ")" and not in_char_class:
+            current_part.append(token)
             paren_depth -= 1
             if paren_depth == 0:
                 result.append("".join(current_part))
                 current_part = []
 
         else:
-            current_part.append(char)
-
-        prev_char = char
+            current_part.append(token)
 
     if current_part:
         result.append("".join(current_part))
@@ -232,21 +314,47 @@ def split_caret_parts(regex: str) -> list[str]:
     return parts
 
 
-def python_substring(regex: str, input: str) -> str:
+def compile_substring_parts(regex: str, engine=re) -> list:
     """
-    Given regex, return the python substring that matches the regex.
+    Compile the parts of the regex searched by python_substring, for
+    extracting the substrings of many inputs.
+    engine is a module with the re.compile API (re or re2).
+    """
+    return [engine.compile(part) for part in split_caret_parts(regex) if part]
+
+
+def substring_of_parts(parts: list, input: str) -> str:
+    """
+    Given the compiled parts of a regex, return the python substring that
+    matches the regex.
     """
-    parts = split_caret_parts(regex)
     substr = []
     for part in parts:
-        if part:
-            match = re.search(part, input)
-            if match:
-                substr.append(match.group())
+        match = part.search(input)
+        if match:
+            substr.append(match.group())
 
     return "".join(substr)
 
 
+def python_substring(regex: str, input: str, engine=re) -> str:
+    """
+    Given regex, return the python substring that matches the regex.
+    engine is a module with the re.search API (re or re2).
+    """
+    return substring_of_parts(compile_substring_parts(regex, engine), input)
+
+
+def is_sampled(input: str, rate: float) -> bool:
+    """
+    Select about a `rate` fraction of the inputs. The choice only depends on
+    the input, so a bug report selects the same inputs when reproduced.
+    """
+    if rate >= 1:
+        return True
+    return zlib.crc32(input.encode(errors="surrogatepass")) < rate * 2**32
+
+
 def timeout_decorator(seconds, error_message="Timeout"):
     """
     Decorator that times out a function after a given number of seconds.
@@ -18,7 +18,7 @@ import rstr
 
 from zkregex_fuzzer.dfa import dfa_string_matching
 from zkregex_fuzzer.logger import logger
-from zkregex_fuzzer.transformers import regex_to_grammar
+from zkregex_fuzzer.transformers import regex_to_grammar, unescape_grammar_output
 from zkregex_fuzzer.utils import check_if_string_is_valid, grammar_fuzzer, pretty_regex
 
 
@@ -187,12 +187,13 @@ class GrammarBasedGenerator(ValidInputGenerator):
         self._max_expansion_trials = 100
 
     def generate_unsafe(self) -> Optional[str]:
-        return grammar_fuzzer(
+        output = grammar_fuzzer(
             self.grammar,
             start_symbol=self._start_symbol,
             max_nonterminals=self._max_nonterminals,
             max_expansion_trials=self._max_expansion_trials,
         )
+        return unescape_grammar_output(output)
 
 
 class RstrGenerator(ValidInputGenerator):
@@ -0,0 +1,92 @@
+import struct
+
+import pytest
+
+from zkregex_fuzzer.runner import (
+    PythonReRunner,
+    Re2Runner,
+    RegexCompileError,
+    RegexRunError,
+)
+from zkregex_fuzzer.runner.subprocess import SnarkjsSubprocess
+
+
+def test_re2_runner_agrees_with_python_re():
+    """Test that the RE2 runner matches and extracts like the Python re runner."""
+    pytest.importorskip("re2")
+    test_cases = [
+        # (regex, inputs)
+        (r"abc", ["abc", "abcd", "ab", ""]),
+        (r"a[bc]+d", ["abd", "acbcd", "ad", "abcx"]),
+        (r"^ab(c|d)e", ["abce", "abde", "abe", "xabce"]),
+        (r"(\r\n|^)to:[a-z]+\r\n", ["to:alice\r\n", "\r\nto:bob\r\n", "to:\r\n"]),
+        (r"[a-z]*x$", ["x", "abcx", "abc", "xa"]),
+    ]
+    for regex, inputs in test_cases:
+        python_runner = PythonReRunner(regex, {})
+        re2_runner = Re2Runner(regex, {})
+        for input in inputs:
+            assert re2_runner.match(input) == python_runner.match(input), (
+                f"RE2 and Python re disagree for regex {regex!r} on {input!r}"
+            )
+
+
+def test_re2_runner_unsupported_pattern():
+    """Test that patterns RE2 does not support raise RegexCompileError."""
+    pytest.importorskip("re2")
+    for regex in [r"(a)\1", r"a(?=b)"]:
+        with pytest.raises(RegexCompileError):
+            Re2Runner(regex, {})
+
+
+def test_re2_runner_not_installed(monkeypatch):
+    """Test that the RE2 runner raises RegexCompileError without google-re2."""
+    monkeypatch.setattr("zkregex_fuzzer.runner.re2.re2", None)
+    with pytest.raises(RegexCompileError):
+        Re2Runner("abc", {})
+    with pytest.raises(ValueError):
+        Re2Runner.get_installed_version()
+
+
+def _write_witness(path, values, n8=32, sections=(1, 2)):
+    """Write a .wtns file with the given values."""
+    header_section = struct.pack("<I", n8) + (7).to_bytes(n8, "little")
+    header_section += struct.pack("<I", len(values))
+    values_section = b"".join(value.to_bytes(n8, "little") for value in values)
+    contents = {1: header_section, 2: values_section}
+    data = struct.pack("<4sII", b"wtns", 2, len(sections))
+    for section_type in sections:
+        section = contents[section_type]
+        data += struct.pack("<IQ", section_type, len(section)) + section
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_read_witness(tmp_path):
+    """Test that read_witness returns the values in [start, end)."""
+    values = [1, 2**200 + 3, 0, 255, 2**253]
+    witness_path = _write_witness(tmp_path / "witness.wtns", values)
+    assert SnarkjsSubprocess.read_witness(witness_path, 0, 5) == values
+    assert SnarkjsSubprocess.read_witness(witness_path, 1, 3) == values[1:3]
+    assert SnarkjsSubprocess.read_witness(witness_path, 2, 2) == []
+    # The end is clamped to the number of values
+    assert SnarkjsSubprocess.read_witness(witness_path, 3, 100) == values[3:]
+
+
+def test_read_witness_invalid(tmp_path):
+    """Test that read_witness raises RegexRunError on invalid witness files."""
+    bad_magic_path = tmp_path / "bad_magic.wtns"
+    _write_witness(bad_magic_path, [1, 2])
+    bad_magic_path.write_bytes(b"wtnx" + bad_magic_path.read_bytes()[4:])
+    empty_path = tmp_path / "empty.wtns"
+    empty_path.write_bytes(b"")
+    invalid_paths = [
+        str(bad_magic_path),
+        str(empty_path),
+        _write_witness(tmp_path / "no_values.wtns", [1, 2], sections=(1,)),
+        _write_witness(tmp_path / "no_header.wtns", [1, 2], sections=(2,)),
+        str(tmp_path / "missing.wtns"),
+    ]
+    for witness_path in invalid_paths:
+        with pytest.raises(RegexRunError):
+            SnarkjsSubprocess.read_witness(witness_path, 0, 2)
@@ -0,0 +1,59 @@
+import random
+import re
+
+from fuzzingbook.Grammars import is_valid_grammar
+
+from zkregex_fuzzer.transformers import regex_to_grammar, unescape_grammar_output
+from zkregex_fuzzer.utils import grammar_fuzzer
+
+
+def test_regex_to_grammar_is_valid():
+    """Test that regex_to_grammar only returns valid grammar rules."""
+    regexes = [r"abc", r"[a-c]x", r"ab{2,3}c", r"<a>", r"x<y>", r"x[0-9]+|y[0-9]*"]
+    for regex in regexes:
+        grammar = regex_to_grammar(regex)
+        assert "__rule_counters__" not in grammar, f"Counters left for {regex}"
+        assert "__shared_rules__" not in grammar, f"Shared rules left for {regex}"
+        assert is_valid_grammar(grammar), f"Invalid grammar for {regex}"
+
+
+def test_regex_to_grammar_generates_matches():
+    """Test that the strings generated from the grammar match the regex."""
+    random.seed(0)
+    regexes = [
+        # Literals
+        r"abc",
+        r"hello world",
+        # Bracket classes
+        r"[a-c]x[0-9]",
+        r"[<>]=",
+        # Repeats
+        r"ab{2,3}c",
+        r"a*b+c?",
+        r"[a-z]{1,4}@",
+        # Literals with the delimiters of the nonterminals
+        r"a<b",
+        r"x<=1",
+        r"y>=2",
+        r"<[ab]",
+        r"[ab]>",
+        r"< a >",
+        r"<a>",
+        r"x<y>",
+        r"<[ab]>",
+        r"a<b>c",
+        r"<>",
+        # Unions
+        r"cat|dog",
+        r"a<|b>",
+        r"<a>|b",
+    ]
+    for regex in regexes:
+        grammar = regex_to_grammar(regex)
+        for _ in range(20):
+            generated = unescape_grammar_output(
+                grammar_fuzzer(grammar, start_symbol="<start>", max_nonterminals=10)
+            )
+            assert re.fullmatch(regex, generated), (
+                f"Generated {generated!r} does not match {regex}"
+            )
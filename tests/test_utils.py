@@ -1,9 +1,12 @@
 from zkregex_fuzzer.utils import (
+    cache_entry_path,
     check_zkregex_rules_basic,
     correct_carret_position,
     extract_parts,
     has_lazy_quantifier,
+    is_sampled,
     is_valid_regex,
+    store_in_cache,
 )
 
 
@@ -217,3 +220,47 @@ def test_extract_parts():
         assert result == expected, (
             f"Failed for regex '{regex}': got {result}, expected {expected}"
         )
+
+
+def test_store_in_cache(tmp_path):
+    """Test that a directory stored in the cache can be loaded back."""
+    dir_path = tmp_path / "work"
+    (dir_path / "regex_js").mkdir(parents=True)
+    (dir_path / "regex.r1cs").write_bytes(b"r1cs")
+    (dir_path / "regex_js" / "regex.wasm").write_bytes(b"wasm")
+
+    cache_path = cache_entry_path(str(tmp_path / "cache"), ["regex", 200])
+    cache_path.parent.mkdir()
+    store_in_cache(str(dir_path), cache_path)
+    assert (cache_path / "regex.r1cs").read_bytes() == b"r1cs"
+    assert (cache_path / "regex_js" / "regex.wasm").read_bytes() == b"wasm"
+
+    # Storing an existing entry keeps it and leaves no staging directory
+    (dir_path / "regex.r1cs").write_bytes(b"other")
+    store_in_cache(str(dir_path), cache_path)
+    assert (cache_path / "regex.r1cs").read_bytes() == b"r1cs"
+    assert list(cache_path.parent.iterdir()) == [cache_path]
+
+
+def test_cache_entry_path():
+    """Test that the cache entry changes with each of the key fields."""
+    key_fields = ["v1", "regex", 200, False, None]
+    cache_path = cache_entry_path("cache", key_fields)
+    assert cache_path == cache_entry_path("cache", list(key_fields))
+    for i in range(len(key_fields)):
+        changed_fields = list(key_fields)
+        changed_fields[i] = "changed"
+        assert cache_entry_path("cache", changed_fields) != cache_path, (
+            f"Expected a different cache entry when changing field {i}"
+        )
+
+
+def test_is_sampled():
+    """Test that is_sampled selects a stable fraction of the inputs."""
+    inputs = [f"input {i}" for i in range(10000)]
+    assert all(is_sampled(input, 1) for input in inputs)
+    assert not any(is_sampled(input, 0) for input in inputs)
+
+    sampled = [input for input in inputs if is_sampled(input, 0.1)]
+    assert sampled == [input for input in inputs if is_sampled(input, 0.1)]
+    assert 800 <= len(sampled) <= 1200, f"Sampled {len(sampled)} of 10000 inputs"